@@ -1,29 +1,18 @@
 
 import sys
 import csv
-import requests
 import json
-from base64 import b64encode
-from nacl import encoding, public
+import os
+from github_client import GitHubClient
+from actions_secrets import PublicKeyCache, encrypt, encrypt_bundle
 
-def encrypt(public_key: str, secret_value: str) -> str:
-    public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-    sealed_box = public.SealedBox(public_key)
-    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
-    return b64encode(encrypted).decode("utf-8")
-
-def create_or_update_secret(public_key: str, secret_value: str, org_name: str, repo_name: str, secret_name: str, github_token: str, key_id: str, encrypted_value: str):
+def create_or_update_secret(client: GitHubClient, org_name: str, repo_name: str, secret_name: str, key_id: str, encrypted_value: str):
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/actions/secrets/{secret_name}"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {github_token}",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
     data = {
         "encrypted_value": encrypted_value,
         "key_id": str(key_id)
     }
-    response = requests.put(url, headers=headers, data=json.dumps(data))
+    response = client.put(url, data=json.dumps(data))
     if response.status_code == 201:
         print(f"Secret {secret_name} added in {repo_name}")
     elif response.status_code == 204:
@@ -31,6 +20,7 @@ def create_or_update_secret(public_key: str, secret_value: str, org_name: str, r
     else:
         print(f"Failed to create/update secret {secret_name} in {repo_name}. Response: {response.status_code}")
         print(response.text)
+    return response.status_code
 
 if __name__ == "__main__":
     org_name = sys.argv[1]
@@ -45,6 +35,9 @@ if __name__ == "__main__":
 
     print("Repo Names:", repo_names)
 
+    client = GitHubClient(github_token)
+    key_cache = PublicKeyCache(client, ttl=int(os.getenv("SECRETS_PUBLIC_KEY_TTL", "3600")), cache_file=os.getenv("SECRETS_PUBLIC_KEY_CACHE"))
+
     secrets = {
         "PROD_TCM_TCI_CLIENT_ID": sys.argv[4], 
         "PROD_TCM_TCI_CLIENT_SECRET": sys.argv[5],
@@ -56,27 +49,28 @@ if __name__ == "__main__":
 
             print("Processing Repo:", repo_name)
 
-            public_key_url = f"https://api.github.com/repos/{org_name}/{repo_name}/actions/secrets/public-key"
-            headers = {
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {github_token}",
-                "X-GitHub-Api-Version": "2022-11-28"
-            }
-            response = requests.get(public_key_url, headers=headers)
-
-            if response.status_code == 200:
-                key_data = response.json()
-                public_key = key_data["key"]
-                key_id = key_data["key_id"]
+            public_key, key_id = key_cache.get(f"repos/{org_name}/{repo_name}")
 
+            if public_key is not None:
+                bundle = {}
                 for secret_name, secret_value in secrets.items():
                     if len(secret_value) >= 1:
-                        encrypted_value = encrypt(public_key, secret_value)
-                        create_or_update_secret(public_key, secret_value, org_name, repo_name, secret_name, github_token, key_id, encrypted_value)
+                        bundle[secret_name] = secret_value
                     else:
                         print(f"Skipping invalid secret value: {secret_name}")
+
+                for secret_name, encrypted_value in encrypt_bundle(public_key, bundle).items():
+                    status_code = create_or_update_secret(client, org_name, repo_name, secret_name, key_id, encrypted_value)
+                    if status_code == 422:
+                        # the cached key was rotated: refetch it and encrypt again
+                        key_cache.invalidate(f"repos/{org_name}/{repo_name}")
+                        public_key, key_id = key_cache.get(f"repos/{org_name}/{repo_name}")
+                        if public_key is not None:
+                            create_or_update_secret(client, org_name, repo_name, secret_name, key_id, encrypt(public_key, bundle[secret_name]))
             else:
                 print(f"Failed to fetch public key for repository: {repo_name}")
         else:
             print(f"Skipping invalid repo row: {repo_row}")
+    key_cache.save()
+    client.print_stats()
     print("Finished processing all repositories and secrets.")
@@ -1,77 +1,213 @@
 
 import os
+import csv
 import sys
+import time
 import subprocess
+import yaml
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tci_token_cache import get_tci_token, authorize_tibcli
+from tci_client import TciClient, TciApiError
+from tci_templates import forget_applied_bodies
 
-def get_tci_token(client_id, client_secret):
-    url = "https://eu.account.cloud.tibco.com/idm/v1/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "scope": "TCI",
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-    response = requests.post(url, headers=headers, data=data)
-    if response.status_code == 200:
-        return response.json().get("access_token")
+# Number of apps configured in parallel in batch mode
+max_workers = int(os.getenv("TCI_MAX_WORKERS", "4"))
+# "tibcli" configures apps with the tibcli binary, "rest" calls the TCI API directly
+backend = os.getenv("TCI_BACKEND", "tibcli")
+# Print the engine variable diff without applying it
+dry_run = "--dry-run" in sys.argv
+
+def read_properties(properties_file):
+    engine_vars = {}
+    with open(properties_file, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('#') or '=' not in line:
+                continue
+            key, value = map(str.strip, line.split('=', 1))
+            if key and value:
+                engine_vars[key] = value
+    return engine_vars
+
+def read_manifest(manifest_file):
+    """Reads the batch manifest: a CSV with app,properties_file columns or a YAML file
+
+    apps:
+      - name: <appname>
+        properties_file: <engine.properties>   # optional
+        vars:                                  # optional, overrides the properties file
+          KEY: value
+    """
+    apps = []
+    if manifest_file.endswith((".yml", ".yaml")):
+        with open(manifest_file) as file:
+            for entry in yaml.safe_load(file).get("apps", []):
+                engine_vars = read_properties(entry["properties_file"]) if entry.get("properties_file") else {}
+                engine_vars.update({key: str(value) for key, value in (entry.get("vars") or {}).items()})
+                apps.append((entry["name"], engine_vars))
+    else:
+        with open(manifest_file, newline='') as file:
+            for row in csv.DictReader(file):
+                apps.append((row["app"].strip(), read_properties(row["properties_file"].strip())))
+    return apps
+
+def configure_app(appname, engine_vars, tibcli_dir):
+    """Runs tibcli app configure for one app. Returns (success, output)."""
+    configure_cmd = ["./tibcli", "app", "configure", appname]
+    for key, value in engine_vars.items():
+        configure_cmd += ["--engineVar", f"{key}={value}"]
+    print(f"Final command: {' '.join(configure_cmd)}")
+
+    with subprocess.Popen(configure_cmd, cwd=tibcli_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        output, error = proc.communicate(b'y\n')
+    if proc.returncode != 0:
+        return False, f"Output: {output.decode()}\nError: {error.decode()}"
+    return True, f"Output: {output.decode()}"
+
+def configure_app_rest(tci_client, app_id, engine_vars):
+    """Updates the engine variables of one app through the TCI API. Returns (success, output)."""
+    try:
+        tci_client.update_engine_variables(app_id, engine_vars)
+    except (TciApiError, requests.exceptions.RequestException) as e:
+        return False, str(e)
+    return True, f"Updated {len(engine_vars)} engine variables of app_id {app_id}"
+
+def diff_engine_vars(desired, current):
+    """Returns (added, changed, removed). Removed names are only reported: neither tibcli nor the API can unset a variable."""
+    added = {key: value for key, value in desired.items() if key not in current}
+    changed = {key: value for key, value in desired.items() if key in current and current[key] != value}
+    removed = sorted(current.keys() - desired.keys())
+    return added, changed, removed
+
+def print_diff(appname, current, added, changed, removed):
+    for key, value in added.items():
+        print(f"{appname}: + {key}={value}")
+    for key, value in changed.items():
+        print(f"{appname}: ~ {key}={current[key]} -> {value}")
+    for key in removed:
+        print(f"{appname}: - {key} (not in properties file, left unchanged)")
+
+def apply_engine_vars(configure, tci_client, app_ids, appname, engine_vars, needs_app_id=True):
+    """Applies only the engine variables that differ from the app's current ones.
+
+    Without needs_app_id (tibcli), an app missing from app_ids gets every variable applied.
+    Returns (status, output) with status success, failure, unchanged or planned (dry run).
+    """
+    app_id = app_ids.get(appname)
+    current = {}
+    if app_id is None:
+        if needs_app_id:
+            return "failure", f"App {appname} not found"
+        print(f"App {appname} not found in the TCI apps listing, applying all engine variables")
     else:
-        print("❌ Failed to retrieve token:", response.text)
-        return None
+        try:
+            current = tci_client.get_engine_variables(app_id)
+        except (TciApiError, requests.exceptions.RequestException) as e:
+            print(f"Unable to read current engine variables of {appname}, applying all of them: {e}")
+
+    added, changed, removed = diff_engine_vars(engine_vars, current)
+    print_diff(appname, current, added, changed, removed)
+    changes = {**added, **changed}
+    if not changes:
+        return "unchanged", "Engine variables already up to date"
+    if dry_run:
+        return "planned", f"{len(changes)} engine variables would be updated"
+    success, output = configure(appname, app_id, changes)
+    if success:
+        forget_applied_bodies(appname, app_id)
+    return ("success" if success else "failure"), output
+
+def prepare_backend(tci_token, tibcli_dir):
+    """Authorizes the selected TCI_BACKEND once and returns apply(appname, engine_vars) -> (status, output)."""
+    tci_client = TciClient(tci_token, pool_size=max_workers)
+    try:
+        app_ids = tci_client.get_app_ids()
+    except (TciApiError, requests.exceptions.RequestException) as e:
+        if backend == "rest":
+            raise
+        # tibcli works by app name, the listing is only needed to diff the current variables
+        print(f"Unable to list TCI apps, applying all engine variables with tibcli: {e}")
+        app_ids = {}
+    if backend == "rest":
+        configure = lambda appname, app_id, engine_vars: configure_app_rest(tci_client, app_id, engine_vars)
+    else:
+        if not dry_run:
+            authorize_tibcli(tibcli_dir, tci_token)
+        configure = lambda appname, app_id, engine_vars: configure_app(appname, engine_vars, tibcli_dir)
+    return lambda appname, engine_vars: apply_engine_vars(configure, tci_client, app_ids, appname, engine_vars, backend == "rest")
 
 def perform_action(appname, tci_token, workspace, properties_file):
+    tibcli_dir = f"{workspace}/chc_scripts/cicd-scripts"
     try:
-        os.chdir(f"{workspace}/chc_scripts/cicd-scripts")
-        subprocess.run(["chmod", "777", "tibcli"], check=True)
-        subprocess.run(["./tibcli", "authorize", "--token", tci_token], check=True)
-
-        # Prepare engine variable arguments
-        engine_vars = []
-
-        # Read properties from the .properties file
-        with open(properties_file, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith('#') or '=' not in line:
-                    continue
-                key, value = map(str.strip, line.split('=', 1))
-                if key and value:
-                    engine_vars.append(f"--engineVar {key}={value}")
+        apply = prepare_backend(tci_token, tibcli_dir)
 
+        engine_vars = read_properties(properties_file)
         if not engine_vars:
             print("No engine variables found in properties file.")
             exit(1)
 
-        print("Running tibcli command with the following engine variables:")
-        for var in engine_vars:
-            print(var)
-
-        configure_cmd = ["./tibcli", "app", "configure", appname] + engine_vars
-        print(f"Final command: {' '.join(configure_cmd)}")
-
-        with subprocess.Popen(configure_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
-            output, error = proc.communicate(b'y\n')
-            if proc.returncode != 0:
-                print("❌ tibcli command failed")
-                print("Output:", output.decode())
-                print("Error:", error.decode())
-                exit(1)
-            else:
-                print("✅ App configuration successful.")
-                print("Output:", output.decode())
-
-    except subprocess.CalledProcessError as e:
+        print(f"Comparing engine variables of app {appname} with {properties_file}:")
+        status, output = apply(appname, engine_vars)
+        if status == "failure":
+            print(f"❌ {backend} configuration failed")
+            print(output)
+            exit(1)
+        if status == "success":
+            print("✅ App configuration successful.")
+        print(output)
+
+    except (subprocess.CalledProcessError, TciApiError, requests.exceptions.RequestException) as e:
         print(f"❌ Command failed: {e}")
         exit(1)
 
+def configure_batch_app(apply, appname, engine_vars):
+    start_time = time.monotonic()
+    if not engine_vars:
+        return "skipped", "no engine variables", 0.0
+    try:
+        status, output = apply(appname, engine_vars)
+    except OSError as e:
+        status, output = "failure", str(e)
+    return status, output, round(time.monotonic() - start_time, 1)
+
+def perform_batch(manifest_file, tci_token, workspace):
+    """Configures every app of the manifest concurrently with a single backend authorization."""
+    tibcli_dir = f"{workspace}/chc_scripts/cicd-scripts"
+    apps = read_manifest(manifest_file)
+    try:
+        apply = prepare_backend(tci_token, tibcli_dir)
+    except (subprocess.CalledProcessError, TciApiError, requests.exceptions.RequestException) as e:
+        print(f"❌ Command failed: {e}")
+        exit(1)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(configure_batch_app, apply, appname, engine_vars): appname for appname, engine_vars in apps}
+        for future in as_completed(futures):
+            appname = futures[future]
+            results[appname] = future.result()
+            status, output, duration = results[appname]
+            print(f"{'❌' if status == 'failure' else '✅'} {appname}: {status} in {duration}s")
+            if status == "failure":
+                print(output)
+
+    width = max([len("app")] + [len(appname) for appname in results])
+    print(f"{'app':<{width}}  {'status':<9}  duration")
+    for appname in sorted(results):
+        status, _, duration = results[appname]
+        print(f"{appname:<{width}}  {status:<9}  {duration}s")
+    if any(status == "failure" for status, _, _ in results.values()):
+        exit(1)
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python3 tibco_configure.py <appname> <properties_file>")
+    args = [arg for arg in sys.argv[1:] if arg != "--dry-run"]
+    batch = len(args) == 2 and args[0] == "--manifest"
+    if len(args) != 2:
+        print("Usage: python3 tibco_configure.py <appname> <properties_file> [--dry-run]")
+        print("       python3 tibco_configure.py --manifest <apps.csv|apps.yaml> [--dry-run]")
         exit(1)
 
-    appname = sys.argv[1]
-    properties_file = sys.argv[2]
     client_id = os.getenv("CIC_TCI_CLIENTID_CICD")
     client_secret = os.getenv("CIC_TCI_CLIENTSECRET_CICD")
     workspace = os.getenv("UNIQUE_WORKSPACE")
@@ -81,5 +217,7 @@ if __name__ == "__main__":
         exit(1)
 
     token = get_tci_token(client_id, client_secret)
-    if token:
-        perform_action(appname, token, workspace, properties_file)
+    if token and batch:
+        perform_batch(args[1], token, workspace)
+    elif token:
+        perform_action(args[0], token, workspace, args[1])
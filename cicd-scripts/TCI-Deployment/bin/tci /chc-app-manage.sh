@@ -45,6 +45,9 @@ readonly WAIT_FOR_STATUS_RETRY_DELAY="${WAIT_FOR_STATUS_RETRY_DELAY:-5}"
 readonly WAIT_FOR_APPID_RETRY_COUNT="${WAIT_FOR_APPID_RETRY_COUNT:-10}"
 readonly WAIT_FOR_APPID_RETRY_DELAY="${WAIT_FOR_APPID_RETRY_DELAY:-60}"
 
+# "python" waits with tci_wait.py (exponential backoff within the same overall budget), "shell" polls at a fixed delay
+readonly TCI_WAITER="${TCI_WAITER:-shell}"
+
 export APPLICATION_TYPE=businessworks
 export APPLICATION_TYPE_BUSINESSWORKS=businessworks
 export APPLICATION_TYPE_FLOGO=flogo
@@ -253,7 +256,11 @@ function deploy_app() {
   
   # 2023/10/13: if deployment failed (for example 504), we have no temp_app_id
   # 2023/10/13: so we loop until we get the temp_app_id
-  if [ "${temp_app_id}" = "" -a "${HTTP_CODE}" = "504" ] ; then
+  if [ "${temp_app_id}" = "" -a "${HTTP_CODE}" = "504" -a "${TCI_WAITER}" = "python" ] ; then
+    echoerr "Deployment is running but TCI API timed out (504), waiting for temp_app_id..."
+    temp_app_id="$(WAIT_FOR_APPID_RETRY_COUNT="${WAIT_FOR_APPID_RETRY_COUNT}" WAIT_FOR_APPID_RETRY_DELAY="${WAIT_FOR_APPID_RETRY_DELAY}" \
+      python3 "${DIRSCRIPT}/tci_wait.py" app-id "${temp_app_name}")" || temp_app_id=""
+  elif [ "${temp_app_id}" = "" -a "${HTTP_CODE}" = "504" ] ; then
   	for retry in $(seq 1 "${WAIT_FOR_APPID_RETRY_COUNT}"); do
 	
 	    echoerr "----------------"
@@ -263,7 +270,7 @@ function deploy_app() {
 	    echoerr "Retry retrieving temp_app_id ${retry} in ${WAIT_FOR_APPID_RETRY_DELAY}s ..."
 	    sleep "${WAIT_FOR_APPID_RETRY_DELAY}"
 
-	    apps="$(get_apps)"
+	    apps="$(get_apps refresh)"
   	    temp_app_id="$(get_app_id_by_name "${temp_app_name}" "${apps}")"
   	    
 	    if [[ "${temp_app_id}" != "" ]]; then
@@ -426,7 +433,7 @@ function undeploy_app() {
   separatelog
   for retry in $(seq 1 "${WAIT_FOR_STATUS_RETRY_COUNT}"); do
 
-    app_id="$(get_app_id_by_name "${app_name}" "$(get_apps)")"
+    app_id="$(get_app_id_by_name "${app_name}" "$(get_apps refresh)")"
 
     if [[ "${app_id}" == "${NOT_FOUND}" ]]; then
       separatelog
@@ -658,6 +665,16 @@ function wait_for_status() {
   local app_name=""
   [ "$#" -ge 3 ] && app_name="${3}"
 
+  if [[ "${TCI_WAITER}" == "python" ]]; then
+    echoerr "Waiting for status ${status} of app_id ${app_id} ${app_name}"
+    if ! WAIT_FOR_STATUS_RETRY_COUNT="${WAIT_FOR_STATUS_RETRY_COUNT}" WAIT_FOR_STATUS_RETRY_DELAY="${WAIT_FOR_STATUS_RETRY_DELAY}" \
+      python3 "${DIRSCRIPT}/tci_wait.py" status "${status}" "${app_id}=${app_name}"; then
+      echoerr "Exiting ..."
+      exit 1
+    fi
+    return 0
+  fi
+
   for retry in $(seq 1 "${WAIT_FOR_STATUS_RETRY_COUNT}"); do
 
     local current_status_object="$(get_app_status "${app_id}" "${app_name}")"
@@ -699,6 +716,20 @@ function wait_for_running_status() {
 
 ################################################################################
 
+# Apps listing used at the start of deploy/undeploy.
+# TCI_APPS_FILE lets an orchestrator running many deployments share one listing taken before they start.
+function get_initial_apps() {
+
+  if [[ -n "${TCI_APPS_FILE-}" && -f "${TCI_APPS_FILE}" ]]; then
+    echoerr "Using apps from ${TCI_APPS_FILE}"
+    cat "${TCI_APPS_FILE}"
+  else
+    get_apps
+  fi
+}
+
+################################################################################
+
 function main() {
 
   # parse arguments for options
@@ -776,7 +807,7 @@ function main() {
     get_tci_token
 
     separatelog
-    local apps="$(get_apps)"
+    local apps="$(get_initial_apps)"
     separatelog
 
     # undeploy temp app if it exists
@@ -797,7 +828,7 @@ function main() {
     get_tci_token
 
     separatelog
-    local apps="$(get_apps)"
+    local apps="$(get_initial_apps)"
     separatelog
 
     # undeploy temp app if it exists
@@ -514,9 +514,14 @@ function update_app_properties() {
   separatelog
   request_body="$(render_engine_variables_request_body "${app_type}")"
   separatelog
-  update_engine_variables "${app_id}" "${request_body}"
-  separatelog
-  wait_for_stopped_status "${app_id}" "${app_name}"
+  if request_body_applied "${app_id}" "engine-variables" "${request_body}"; then
+    echoerr "Engine variables unchanged since last update - omitting update engine variables ..."
+  else
+    update_engine_variables "${app_id}" "${request_body}"
+    separatelog
+    wait_for_stopped_status "${app_id}" "${app_name}"
+    record_request_body "${app_id}" "engine-variables" "${request_body}"
+  fi
 
   export CI_COMMIT_TAG="${CI_COMMIT_TAG:=NO_TAG}"
 
@@ -524,9 +529,14 @@ function update_app_properties() {
   separatelog
   request_body="$(render_tci_request_body "${DIRSCRIPT}/../../template/user-defined-variables.json")"
   separatelog
-  create_user_defined_variables "${app_id}" "${request_body}"
-  separatelog
-  wait_for_stopped_status "${app_id}" "${app_name}"
+  if request_body_applied "${app_id}" "user-defined-variables" "${request_body}"; then
+    echoerr "User defined variables unchanged since last update - omitting create user defined variables ..."
+  else
+    create_user_defined_variables "${app_id}" "${request_body}"
+    separatelog
+    wait_for_stopped_status "${app_id}" "${app_name}"
+    record_request_body "${app_id}" "user-defined-variables" "${request_body}"
+  fi
 
   # update hybrid agent access key
   local agent_key="$(render_hybrid_agent_access_key)"
@@ -541,9 +551,14 @@ function update_app_properties() {
   separatelog
   request_body="$(render_tci_request_body "${DIRSCRIPT}/../../template/app-attributes.json")"
   separatelog
-  update_app_attributes "${app_id}" "${request_body}"
-  separatelog
-  wait_for_stopped_status "${app_id}" "${app_name}"
+  if request_body_applied "${app_id}" "app-attributes" "${request_body}"; then
+    echoerr "App attributes unchanged since last update - omitting update app attributes ..."
+  else
+    update_app_attributes "${app_id}" "${request_body}"
+    separatelog
+    wait_for_stopped_status "${app_id}" "${app_name}"
+    record_request_body "${app_id}" "app-attributes" "${request_body}"
+  fi
 
   #Get TCI token
   #  get_tci_token
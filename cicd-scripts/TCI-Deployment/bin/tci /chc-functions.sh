@@ -107,6 +107,9 @@ function render_hybrid_agent_access_key() {
 function Engine_properties() {
   echo "${engine_json}"
 }
+# Template rendering and applied request bodies ledger, see tci_templates.py
+TCI_TEMPLATES_SCRIPT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/tci_templates.py"
+
 # Public convenience function
 # Render tci request body from template file and environment variables
 function render_tci_request_body() {
@@ -116,12 +119,40 @@ function render_tci_request_body() {
 
   echoerr "Rendering template file ${template_file}"
   
-  cat "${template_file_path}" | envsubst | tee "/tmp/${template_file}"
+  # renders like envsubst and fails on a body that is not valid JSON
+  python3 "${TCI_TEMPLATES_SCRIPT}" render "${template_file_path}" | tee "/tmp/${template_file}"
+}
+
+# Optional ledger of request bodies applied to persistent apps, see tci_templates.py: enabled when TCI_TEMPLATE_LEDGER_FILE is set
+# Arguments:  app_id
+#             kind of request body
+#             request body
+# Returns 0 when this request body was the last one of its kind applied to the app
+function request_body_applied() {
+  printf '%s' "${3}" | python3 "${TCI_TEMPLATES_SCRIPT}" applied "${1}" "${2}"
+}
+
+function record_request_body() {
+  printf '%s' "${3}" | python3 "${TCI_TEMPLATES_SCRIPT}" record "${1}" "${2}"
+}
+
+# Optional app catalog, see tci_app_catalog.py: enabled when TCI_APP_CATALOG_FILE is set
+TCI_APP_CATALOG_SCRIPT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/tci_app_catalog.py"
+
+function app_catalog() {
+  python3 "${TCI_APP_CATALOG_SCRIPT}" "$@"
 }
 
 # Get all apps
+# Arguments:  "refresh" to list the apps again instead of using the app catalog
 function get_apps() {
 
+  if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+    echoerr "Getting apps from catalog"
+    app_catalog apps "${1-}"
+    return
+  fi
+
   echoerr "Getting apps"
   invoke_tci_v1_rest_api "200" "GET" "apps"
   echoerr "Got apps"
@@ -148,7 +179,11 @@ function get_app_id_by_name() {
   echoerr "Getting app_id for app_name ${app_name}"
 
   local app_id
-  app_id="$(jq --raw-output '.[] | select(.appName==env.app_name).appId | select(.!=null) | select(.!="")' <<<"${apps}")"
+  if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+    app_id="$(app_catalog id "${app_name}")"
+  else
+    app_id="$(jq --raw-output '.[] | select(.appName==env.app_name).appId | select(.!=null) | select(.!="")' <<<"${apps}")"
+  fi
 
   if [[ -z "${app_id}" ]]; then
     app_id="${NOT_FOUND}"
@@ -209,6 +244,9 @@ function create_app_force_overwrite() {
       echoerr "${response}"
       jq --raw-output '.appId' <<<"${response}"
       echoerr "Created app ${app_name}"
+      if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+        app_catalog created "${app_name}" "$(jq --raw-output '.appId' <<<"${response}")"
+      fi
       ;;
   esac
 }
@@ -227,6 +265,9 @@ function copy_app() {
   response="$(invoke_tci_v1_rest_api "200" "POST" "apps/${app_id}/copy?appName=${app_name}")"
   echoerr "${response}"
   echo "${response}"
+  if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+    app_catalog created "${app_name}" "$(jq --raw-output '.appId' <<<"${response}")"
+  fi
 }
 
 # Replace app
@@ -237,6 +278,11 @@ function replace_app() {
 
   echoerr "Replacing app_id ${app_id} with source_app_id ${source_app_id}"
   invoke_tci_v1_rest_api "200" "POST" "apps/${app_id}/replace?sourceAppId=${source_app_id}"
+  if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+    app_catalog invalidate
+  fi
+  # the replaced app now has the variables and attributes of the source app
+  python3 "${TCI_TEMPLATES_SCRIPT}" forget "${app_id}"
 }
 
 # Delete app
@@ -246,6 +292,9 @@ function delete_app() {
 
   echoerr "Deleting app_id ${app_id}"
   invoke_tci_v1_rest_api "202" "DELETE" "apps/${app_id}"
+  if [[ -n "${TCI_APP_CATALOG_FILE-}" ]]; then
+    app_catalog deleted "${app_id}"
+  fi
 }
 
 # Scale app
@@ -31,12 +31,7 @@ function main() {
   if ! [[ -f "${application_properties_file_path}" ]]; then
     echoerr "File ${application_properties_file_path} not found - omitting render application properties json ..."
   else
-    filter_file "${application_properties_file_path}" |
-      sed 's/\r//' |
-      envsubst |
-      sed -e 's/^\([^=]*\)=\(.*\)/\1====\2/' |
-      jq --slurp --raw-input 'split("\n") | map(select(. !="")) | map(split("====") | { ("name"): .[0],"value":.[1] } )' \
-        >"${application_properties_json_file_path}"
+    python3 "${DIRSCRIPT}/../../render_properties.py" render "${application_properties_file_path}" "${application_properties_json_file_path}"
     echoerr "Rendered application properties json"
   fi
 }
@@ -2,46 +2,62 @@
 import os
 import sys
 import subprocess
-import requests
 import shlex
+import requests
+from tci_token_cache import get_tci_token, authorize_tibcli
+from tci_client import TciClient, TciApiError
+from tci_templates import LEDGER_FILE, forget_applied_bodies
+
+# "tibcli" configures apps with the tibcli binary, "rest" calls the TCI API directly
+backend = os.getenv("TCI_BACKEND", "tibcli")
 
-def get_tci_token(client_id, client_secret):
-    url = "https://eu.account.cloud.tibco.com/idm/v1/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "scope": "TCI",
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-    response = requests.post(url, headers=headers, data=data)
-    if response.status_code == 200:
-        return response.json().get("access_token")
-    else:
-        print("❌ Failed to retrieve token:", response.text)
+ENGINE_VARS = {
+    "BW_JAVA_OPTS": "--add-exports=java.base/sun.security.ssl=ALL-UNNAMED",
+    "java.property.com.tibco.tibjms.connect.attemptcount": "10",
+    "java.property.com.tibco.tibjms.connect.attemptdelay": "20000",
+    "java.property.com.tibco.tibjms.connect.attempttimeout": "45000",
+    "java.property.com.tibco.tibjms.reconnect.attemptcount": "10",
+    "java.property.com.tibco.tibjms.reconnect.attemptdelay": "20000",
+    "java.property.com.tibco.tibjms.reconnect.attempttimeout": "45000"
+}
+
+def perform_rest_action(appname, tci_token):
+    try:
+        tci_client = TciClient(tci_token)
+        app_id = tci_client.get_app_ids().get(appname)
+        if app_id is None:
+            print(f"❌ App {appname} not found")
+            exit(1)
+        tci_client.update_engine_variables(app_id, ENGINE_VARS)
+        print("✅ App configuration successful.")
+        forget_applied_bodies(appname, app_id)
+    except (TciApiError, requests.exceptions.RequestException) as e:
+        print(f"❌ Request failed: {e}")
+        exit(1)
+
+def lookup_app_id(appname, tci_token):
+    """App id for the ledger after a tibcli configure, which works by app name; None when unknown."""
+    if not LEDGER_FILE:
+        return None
+    try:
+        return TciClient(tci_token).get_app_ids().get(appname)
+    except (TciApiError, requests.exceptions.RequestException) as e:
+        print(f"Unable to list TCI apps: {e}")
         return None
 
 def perform_action(appname, tci_token, workspace):
     try:
         os.chdir(f"{workspace}/chc_scripts/cicd-scripts")
-        subprocess.run("chmod 777 tibcli", shell=True, check=True)
-        subprocess.run(f"./tibcli authorize --token {shlex.quote(tci_token)}", shell=True, check=True)
-
-        configure_cmd = (
-            f'./tibcli app configure {shlex.quote(appname)} '
-            '--engineVar "BW_JAVA_OPTS=--add-exports=java.base/sun.security.ssl=ALL-UNNAMED" '
-            '--engineVar "java.property.com.tibco.tibjms.connect.attemptcount=10" '
-            '--engineVar "java.property.com.tibco.tibjms.connect.attemptdelay=20000" '
-            '--engineVar "java.property.com.tibco.tibjms.connect.attempttimeout=45000" '
-            '--engineVar "java.property.com.tibco.tibjms.reconnect.attemptcount=10" '
-            '--engineVar "java.property.com.tibco.tibjms.reconnect.attemptdelay=20000" '
-            '--engineVar "java.property.com.tibco.tibjms.reconnect.attempttimeout=45000"'
-        )
+        authorize_tibcli(os.getcwd(), tci_token)
+
+        configure_cmd = f'./tibcli app configure {shlex.quote(appname)} ' + ' '.join(
+            f'--engineVar {shlex.quote(f"{key}={value}")}' for key, value in ENGINE_VARS.items())
         subprocess.run(configure_cmd, shell=True, check=True, input=b"yes\n")
         print("✅ App configuration successful.")
     except subprocess.CalledProcessError as e:
         print(f"❌ Command failed: {e}")
         exit(1)
+    forget_applied_bodies(appname, lookup_app_id(appname, tci_token))
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -58,5 +74,7 @@ if __name__ == "__main__":
         exit(1)
 
     token = get_tci_token(client_id, client_secret)
-    if token:
+    if token and backend == "rest":
+        perform_rest_action(appname, token)
+    elif token:
         perform_action(appname, token, workspace)
@@ -0,0 +1,121 @@
+
+import os
+import sys
+import json
+import time
+from tci_client import TciClient
+from tci_token_cache import file_lock, write_private
+
+# Optional file persisting the catalog between calls, shared by the shell functions of chc-functions.sh
+CATALOG_FILE = os.getenv("TCI_APP_CATALOG_FILE")
+# Seconds a persisted catalog is trusted before the apps are listed again
+CATALOG_TTL = int(os.getenv("TCI_APP_CATALOG_TTL", "300"))
+
+class AppCatalog:
+    """Indexed view of the apps of a subscription, listed once and then updated in place.
+
+    Lookups by name and by id are dict lookups. When cache_file is given the catalog is shared with
+    other processes for ttl seconds; create/copy/delete update it and replace invalidates it.
+    """
+
+    def __init__(self, tci_client, cache_file=None, ttl=CATALOG_TTL):
+        self.tci_client = tci_client
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.loaded_at = None
+        self.apps_by_id = {}
+        self.ids_by_name = {}
+
+    def index(self, apps, loaded_at):
+        self.loaded_at = loaded_at
+        self.apps_by_id = {app["appId"]: app for app in apps if app.get("appId")}
+        self.ids_by_name = {app["appName"]: app["appId"] for app in self.apps_by_id.values()}
+
+    def read_cache(self):
+        if not (self.cache_file and os.path.exists(self.cache_file)):
+            return False
+        with open(self.cache_file) as file:
+            try:
+                cache = json.load(file)
+            except json.JSONDecodeError:
+                return False
+        # a catalog of another TCI organization or region is never reused
+        if cache.get("api_url") != self.tci_client.base_url or time.time() - cache["loaded_at"] > self.ttl:
+            return False
+        self.index(cache["apps"], cache["loaded_at"])
+        return True
+
+    def save(self):
+        if self.cache_file and self.loaded_at is not None:
+            cache = {"api_url": self.tci_client.base_url, "loaded_at": self.loaded_at, "apps": list(self.apps_by_id.values())}
+            write_private(self.cache_file, json.dumps(cache))
+
+    def load(self, refresh=False):
+        if not refresh and self.loaded_at is not None and time.time() - self.loaded_at <= self.ttl:
+            return
+        if refresh or not self.read_cache():
+            self.index(self.tci_client.get_apps(), time.time())
+            self.save()
+
+    def apps(self):
+        self.load()
+        return list(self.apps_by_id.values())
+
+    def app_id(self, app_name):
+        self.load()
+        return self.ids_by_name.get(app_name)
+
+    def app(self, app_id):
+        self.load()
+        return self.apps_by_id.get(app_id)
+
+    def app_status(self, app_id):
+        app = self.app(app_id)
+        return app.get("status") if app else None
+
+    def record(self, app_name, app_id):
+        """Adds an app just created or copied."""
+        if self.loaded_at is not None:
+            self.apps_by_id[app_id] = {"appId": app_id, "appName": app_name}
+            self.ids_by_name[app_name] = app_id
+
+    def forget(self, app_id):
+        """Removes an app just deleted."""
+        app = self.apps_by_id.pop(app_id, None)
+        if app:
+            self.ids_by_name.pop(app["appName"], None)
+
+    def invalidate(self):
+        self.loaded_at = None
+        self.apps_by_id = {}
+        self.ids_by_name = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+if __name__ == "__main__":
+    usage = ("Usage: python3 tci_app_catalog.py apps [refresh] | id <app_name> | status <app_id>\n"
+             "                                  | created <app_name> <app_id> | deleted <app_id> | invalidate")
+    commands = {"apps": 0, "id": 1, "status": 1, "created": 2, "deleted": 1, "invalidate": 0}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands or len(sys.argv) < 2 + commands[sys.argv[1]]:
+        print(usage, file=sys.stderr)
+        exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    catalog = AppCatalog(TciClient(os.getenv("TCI_TOKEN", "")), CATALOG_FILE)
+    # read-modify-write of the shared file is serialized between concurrent deployments
+    with file_lock(CATALOG_FILE or os.path.join(os.getcwd(), ".tci-app-catalog")):
+        if command == "apps":
+            catalog.load(refresh=args[:1] == ["refresh"])
+            print(json.dumps(catalog.apps()))
+        elif command == "id":
+            print(catalog.app_id(args[0]) or "")
+        elif command == "status":
+            print(catalog.app_status(args[0]) or "")
+        elif command == "invalidate":
+            catalog.invalidate()
+        elif catalog.read_cache():
+            if command == "created":
+                catalog.record(args[0], args[1])
+            else:
+                catalog.forget(args[0])
+            catalog.save()
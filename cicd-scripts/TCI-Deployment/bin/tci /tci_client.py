@@ -0,0 +1,62 @@
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+TCI_API_URL = f"https://{os.getenv('CIC_TCI_V1_API_URL', 'eu.api.cloud.tibco.com/tci/v1')}/subscriptions/0"
+
+class TciApiError(Exception):
+    """Raised when the TCI API answers with an unexpected HTTP status."""
+
+    def __init__(self, method, path, status_code, text):
+        super().__init__(f"{method} {path} returned {status_code}: {text}")
+        self.status_code = status_code
+
+class TciClient:
+    """TCI v1 REST API client sharing one pooled session, the Python side of invoke_tci_v1_rest_api
+    in chc-functions.sh. Safe to use from several threads.
+    """
+
+    def __init__(self, tci_token, pool_size=10, timeout=60, api_url=None):
+        # api_url (host/path like CIC_TCI_V1_API_URL) targets another TCI region than the default
+        self.base_url = f"https://{api_url}/subscriptions/0" if api_url else TCI_API_URL
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "accept": "application/json",
+            "Authorization": f"Bearer {tci_token}"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def request(self, expected_status, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, f"{self.base_url}/{path}", **kwargs)
+        if response.status_code != expected_status:
+            raise TciApiError(method, path, response.status_code, response.text)
+        return response
+
+    def get_apps(self):
+        return self.request(200, "GET", "apps").json()
+
+    def get_app_ids(self):
+        """Returns {appName: appId} for every app of the subscription."""
+        return {app["appName"]: app["appId"] for app in self.get_apps() if app.get("appId")}
+
+    def get_app_status(self, app_id):
+        return self.request(200, "GET", f"apps/{app_id}/status").json()
+
+    def get_engine_variables(self, app_id):
+        """Returns the current engine variables of an app as a {name: value} dict."""
+        variables = self.request(200, "GET", f"apps/{app_id}/env/variables?variableType=engine").json()
+        return {variable["name"]: variable.get("value") for variable in variables}
+
+    def update_app_variables(self, app_id, variables):
+        """Sets app variables from a {name: value} dict."""
+        body = [{"name": name, "value": value} for name, value in variables.items()]
+        return self.request(202, "PUT", f"apps/{app_id}/env/variables?variableType=app", json=body)
+
+    def update_engine_variables(self, app_id, variables):
+        """Sets engine variables from a {name: value} dict."""
+        body = [{"name": name, "value": value} for name, value in variables.items()]
+        return self.request(202, "PUT", f"apps/{app_id}/env/variables?variableType=engine", json=body)
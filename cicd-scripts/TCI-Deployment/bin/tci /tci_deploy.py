@@ -0,0 +1,160 @@
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import yaml
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from tci_token_cache import get_tci_token_with_expiry
+from tci_client import TciClient, TciApiError
+
+MANAGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chc-app-manage.sh")
+# Per-deployment chc-app-manage.sh logs, shared apps listings and the summary are written here
+LOG_DIR = os.getenv("TCI_DEPLOY_LOG_DIR", "deploy-logs")
+# Concurrency of an environment that does not set its own
+DEFAULT_CONCURRENCY = int(os.getenv("TCI_DEPLOY_CONCURRENCY", "4"))
+
+print_lock = threading.Lock()
+
+def log(message):
+    with print_lock:
+        print(message, flush=True)
+
+def read_plan(plan_file):
+    """Reads and checks the deployment plan:
+
+    environments:
+      DEV:
+        concurrency: 4                                 # optional, TCI_DEPLOY_CONCURRENCY by default
+        client_id_env: CIC_TCI_CLIENTID_CICD           # optional, env variables holding the TCI credentials
+        client_secret_env: CIC_TCI_CLIENTSECRET_CICD
+        api_url: eu.api.cloud.tibco.com/tci/v1         # optional, CIC_TCI_V1_API_URL for this organization
+    deployments:
+      - app: <app name>
+        environment: DEV
+        properties: /tmp/dev.json
+        ear: <path to ear>
+        manifest: <path to manifest.json>
+    """
+    with open(plan_file) as file:
+        plan = yaml.safe_load(file)
+    environments = plan.get("environments") or {}
+    deployments = plan.get("deployments") or []
+
+    seen = set()
+    for deployment in deployments:
+        for field in ("app", "environment", "ear"):
+            if not deployment.get(field):
+                raise ValueError(f"Deployment {deployment} has no {field}")
+        if deployment["environment"] not in environments:
+            raise ValueError(f"Deployment of {deployment['app']} targets undeclared environment {deployment['environment']}")
+        # the shared apps listing is only valid while each app is deployed once per environment
+        key = (deployment["environment"], deployment["app"])
+        if key in seen:
+            raise ValueError(f"{deployment['app']} is deployed more than once to {deployment['environment']}")
+        seen.add(key)
+    return environments, deployments
+
+class Environment:
+    """Token and apps listing of one TCI organization, shared by all of its deployments."""
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.concurrency = int(settings.get("concurrency", DEFAULT_CONCURRENCY))
+        self.client_id = os.getenv(settings.get("client_id_env", "CIC_TCI_CLIENTID_CICD"))
+        self.client_secret = os.getenv(settings.get("client_secret_env", "CIC_TCI_CLIENTSECRET_CICD"))
+        self.api_url = settings.get("api_url") or os.getenv("CIC_TCI_V1_API_URL", "eu.api.cloud.tibco.com/tci/v1")
+        self.apps_file = os.path.abspath(os.path.join(LOG_DIR, f"{name}-apps.json"))
+        if not all([self.client_id, self.client_secret]):
+            raise ValueError(f"Missing TCI credentials for environment {name}")
+
+    def token(self):
+        # cached in the shared token cache, so this only mints a token when the previous one is near expiry
+        token, expires_at = get_tci_token_with_expiry(self.client_id, self.client_secret)
+        if token is None:
+            raise RuntimeError(f"Unable to get a TCI token for environment {self.name}")
+        return token, expires_at
+
+    def snapshot_apps(self):
+        token, _ = self.token()
+        apps = TciClient(token, api_url=self.api_url).get_apps()
+        with open(self.apps_file, "w") as file:
+            json.dump(apps, file)
+        log(f"{self.name}: {len(apps)} apps listed")
+
+    def child_env(self):
+        token, expires_at = self.token()
+        env = dict(os.environ)
+        env.update({
+            "CIC_TCI_CLIENTID_CICD": self.client_id,
+            "CIC_TCI_CLIENTSECRET_CICD": self.client_secret,
+            "CIC_TCI_V1_API_URL": self.api_url,
+            "TCI_TOKEN": token,
+            # same format as get_tci_token in chc-functions.sh
+            "TCI_TOKEN_EXPIRE_DATE": datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d-%H-%M-%S"),
+            "TCI_APPS_FILE": self.apps_file
+        })
+        return env
+
+def deploy(environment, deployment):
+    app_name = deployment["app"]
+    log_file = os.path.join(LOG_DIR, f"{environment.name}-{app_name}.log")
+    command = ["bash", MANAGE_SCRIPT, "deploy", app_name, deployment.get("properties", ""), deployment["ear"], deployment.get("manifest", "")]
+    log(f"{environment.name}: deploying {app_name}, log in {log_file}")
+
+    start_time = time.monotonic()
+    try:
+        with open(log_file, "w") as file:
+            returncode = subprocess.run(command, env=environment.child_env(), stdout=file, stderr=subprocess.STDOUT).returncode
+        result = "success" if returncode == 0 else f"failed ({returncode})"
+    except Exception as e:
+        result = f"error: {e}"
+    duration = round(time.monotonic() - start_time, 1)
+    log(f"{'✅' if result == 'success' else '❌'} {environment.name}: {app_name} {result} in {duration}s")
+    return {"environment": environment.name, "app": app_name, "result": result, "seconds": duration, "log": log_file}
+
+def print_summary(results):
+    width = max([len("app")] + [len(result["app"]) for result in results])
+    print(f"{'environment':<12}  {'app':<{width}}  {'result':<12}  duration")
+    for result in sorted(results, key=lambda r: (r["environment"], r["app"])):
+        print(f"{result['environment']:<12}  {result['app']:<{width}}  {result['result']:<12}  {result['seconds']}s")
+
+def run_plan(plan_file):
+    """Runs every deployment of the plan, each environment with its own concurrency limit, all environments at once."""
+    environment_settings, deployments = read_plan(plan_file)
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    environments = {}
+    for name in {deployment["environment"] for deployment in deployments}:
+        environments[name] = Environment(name, environment_settings[name])
+        environments[name].snapshot_apps()
+
+    executors = {name: ThreadPoolExecutor(max_workers=environment.concurrency) for name, environment in environments.items()}
+    try:
+        futures = [executors[d["environment"]].submit(deploy, environments[d["environment"]], d) for d in deployments]
+        results = [future.result() for future in futures]
+    finally:
+        for executor in executors.values():
+            executor.shutdown()
+
+    with open(os.path.join(LOG_DIR, "summary.json"), "w") as file:
+        json.dump(results, file, indent=2)
+    print_summary(results)
+    return all(result["result"] == "success" for result in results)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python3 tci_deploy.py <deployment_plan.yaml>")
+        exit(1)
+
+    try:
+        success = run_plan(sys.argv[1])
+    except (ValueError, RuntimeError, TciApiError, requests.exceptions.RequestException) as e:
+        print(f"❌ {e}")
+        exit(1)
+    if not success:
+        exit(1)
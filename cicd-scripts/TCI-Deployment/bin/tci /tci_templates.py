@@ -0,0 +1,106 @@
+
+import os
+import sys
+import json
+import hashlib
+from tci_token_cache import file_lock, write_private
+
+# render_properties.py lives two levels up, next to update_properties.sh
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from render_properties import substitute
+
+# Optional record of the request bodies last applied to persistent apps, so unchanged ones are not sent again.
+# Anything changing an app outside these request bodies must forget it with forget_applied_bodies
+LEDGER_FILE = os.getenv("TCI_TEMPLATE_LEDGER_FILE")
+
+class TemplateError(Exception):
+    """Raised when a rendered template is not valid JSON."""
+
+def render_template(path, env=os.environ):
+    """Renders a template like envsubst, raising TemplateError when the body is not valid JSON."""
+    with open(path) as file:
+        body = substitute(file.read(), env)
+    try:
+        json.loads(body)
+    except json.JSONDecodeError as e:
+        raise TemplateError(f"{os.path.basename(path)} renders to invalid JSON: {e}")
+    return body
+
+def body_digest(body):
+    """Digest of the JSON value, so whitespace-only template changes do not count as changes."""
+    return hashlib.sha256(json.dumps(json.loads(body), sort_keys=True).encode("utf-8")).hexdigest()
+
+class AppliedLedger:
+    """Digest of the last request body of each kind applied to each app."""
+
+    def __init__(self, ledger_file):
+        self.ledger_file = ledger_file
+        self.api_url = os.getenv("CIC_TCI_V1_API_URL", "eu.api.cloud.tibco.com/tci/v1")
+        self.entries = {}
+        if os.path.exists(ledger_file):
+            with open(ledger_file) as file:
+                try:
+                    self.entries = json.load(file)
+                except json.JSONDecodeError:
+                    self.entries = {}
+
+    def key(self, app_id, kind):
+        return f"{self.api_url}/{app_id}/{kind}"
+
+    def is_applied(self, app_id, kind, body):
+        return self.entries.get(self.key(app_id, kind)) == body_digest(body)
+
+    def record(self, app_id, kind, body):
+        self.entries[self.key(app_id, kind)] = body_digest(body)
+
+    def forget(self, app_id):
+        prefix = self.key(app_id, "")
+        self.entries = {key: digest for key, digest in self.entries.items() if not key.startswith(prefix)}
+
+    def save(self):
+        write_private(self.ledger_file, json.dumps(self.entries, indent=2))
+
+def forget_applied_bodies(appname, app_id):
+    """Drops the app from the ledger: its engine variables changed outside the request bodies,
+    so the next properties update must send them again.
+    """
+    if not LEDGER_FILE:
+        return
+    if app_id is None:
+        print(f"⚠️ App id of {appname} unknown, its entries in {LEDGER_FILE} may be stale")
+        return
+    with file_lock(LEDGER_FILE):
+        ledger = AppliedLedger(LEDGER_FILE)
+        ledger.forget(app_id)
+        ledger.save()
+
+if __name__ == "__main__":
+    usage = ("Usage: python3 tci_templates.py render <template_file>\n"
+             "       python3 tci_templates.py applied|record <app_id> <kind> < request_body\n"
+             "       python3 tci_templates.py forget <app_id>")
+    commands = {"render": 1, "applied": 2, "record": 2, "forget": 1}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands or len(sys.argv) != 2 + commands[sys.argv[1]]:
+        print(usage, file=sys.stderr)
+        exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "render":
+        try:
+            sys.stdout.write(render_template(args[0]))
+        except TemplateError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            exit(1)
+        exit(0)
+
+    # without a ledger nothing is ever considered applied
+    if not LEDGER_FILE:
+        exit(1 if command == "applied" else 0)
+    with file_lock(LEDGER_FILE):
+        ledger = AppliedLedger(LEDGER_FILE)
+        if command == "applied":
+            exit(0 if ledger.is_applied(args[0], args[1], sys.stdin.read()) else 1)
+        if command == "record":
+            ledger.record(args[0], args[1], sys.stdin.read())
+        else:
+            ledger.forget(args[0])
+        ledger.save()
@@ -0,0 +1,95 @@
+
+import os
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import subprocess
+import contextlib
+import requests
+
+IDM_TOKEN_URL = f"https://{os.getenv('CIC_IDM_V1_API_URL', 'eu.account.cloud.tibco.com/idm/v1')}/oauth2/token"
+TOKEN_CACHE_FILE = os.getenv("TCI_TOKEN_CACHE_FILE", os.path.join(tempfile.gettempdir(), "tci-token-cache.json"))
+TIBCLI_MARKER = ".tibcli-authorized"
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive lock shared by every process using the same path."""
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def fingerprint(*values):
+    return hashlib.sha256("\0".join(values).encode("utf-8")).hexdigest()
+
+def write_private(path, content):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+def get_tci_token(client_id, client_secret, scope="TCI"):
+    """Returns a TCI access token, minting one only when the cached token is missing or near expiry.
+
+    Tokens are cached per client id and scope in TCI_TOKEN_CACHE_FILE and, like get_tci_token
+    in chc-functions.sh, are reused for half of their expires_in.
+    """
+    token, _ = get_tci_token_with_expiry(client_id, client_secret, scope)
+    return token
+
+def get_tci_token_with_expiry(client_id, client_secret, scope="TCI"):
+    """Same as get_tci_token but returns (access_token, expires_at epoch seconds), or (None, None)."""
+    key = fingerprint(client_id, scope)
+    with file_lock(TOKEN_CACHE_FILE):
+        cache = {}
+        if os.path.exists(TOKEN_CACHE_FILE):
+            with open(TOKEN_CACHE_FILE) as file:
+                try:
+                    cache = json.load(file)
+                except json.JSONDecodeError:
+                    cache = {}
+        now = time.time()
+        cache = {k: entry for k, entry in cache.items() if entry["expires_at"] > now}
+        if key in cache:
+            print("Using cached TCI token")
+            return cache[key]["access_token"], cache[key]["expires_at"]
+
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        data = {
+            "grant_type": "client_credentials",
+            "scope": scope,
+            "client_id": client_id,
+            "client_secret": client_secret
+        }
+        response = requests.post(IDM_TOKEN_URL, headers=headers, data=data)
+        if response.status_code != 200:
+            print("❌ Failed to retrieve token:", response.text)
+            return None, None
+
+        token_data = response.json()
+        cache[key] = {
+            "access_token": token_data["access_token"],
+            "expires_at": now + int(token_data.get("expires_in", 0)) / 2
+        }
+        write_private(TOKEN_CACHE_FILE, json.dumps(cache))
+        return token_data["access_token"], cache[key]["expires_at"]
+
+def authorize_tibcli(tibcli_dir, tci_token):
+    """Runs tibcli authorize only when tibcli is not already authorized with this token.
+
+    Raises subprocess.CalledProcessError when tibcli fails.
+    """
+    marker = os.path.join(tibcli_dir, TIBCLI_MARKER)
+    with file_lock(marker):
+        if os.path.exists(marker):
+            with open(marker) as file:
+                if file.read() == fingerprint(tci_token):
+                    print("tibcli already authorized")
+                    return
+        subprocess.run(["chmod", "777", "tibcli"], check=True, cwd=tibcli_dir)
+        subprocess.run(["./tibcli", "authorize", "--token", tci_token], check=True, cwd=tibcli_dir)
+        write_private(marker, fingerprint(tci_token))
@@ -0,0 +1,121 @@
+
+import os
+import sys
+import json
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from tci_client import TciClient, TciApiError
+
+# First poll delay, multiplied by BACKOFF_FACTOR after every poll without progress, up to MAX_DELAY
+INITIAL_DELAY = float(os.getenv("TCI_WAIT_INITIAL_DELAY", "2"))
+MAX_DELAY = float(os.getenv("TCI_WAIT_MAX_DELAY", "30"))
+BACKOFF_FACTOR = float(os.getenv("TCI_WAIT_BACKOFF_FACTOR", "2"))
+# Optional JSON lines file receiving one time-to-status record per waited app
+METRICS_FILE = os.getenv("TCI_WAIT_METRICS_FILE")
+
+metrics_lock = threading.Lock()
+
+def echoerr(message):
+    print(message, file=sys.stderr, flush=True)
+
+def default_deadline(count_env, count_default, delay_env, delay_default):
+    """Same overall budget as the shell loops: retry count * retry delay, unless TCI_WAIT_DEADLINE is set."""
+    if os.getenv("TCI_WAIT_DEADLINE"):
+        return float(os.getenv("TCI_WAIT_DEADLINE"))
+    return int(os.getenv(count_env, count_default)) * float(os.getenv(delay_env, delay_default))
+
+def record_metrics(record):
+    echoerr(json.dumps(record))
+    if METRICS_FILE:
+        with metrics_lock, open(METRICS_FILE, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+def poll(check, deadline, label):
+    """Calls check() -> (done, progress, result) with exponential backoff until done or the deadline.
+
+    The delay goes back to INITIAL_DELAY whenever progress changes, so fast transitions are seen quickly
+    while long ones are polled less and less often. Returns (result, elapsed seconds, polls) or
+    (None, elapsed, polls) when the deadline is reached.
+    """
+    start_time = time.monotonic()
+    delay = INITIAL_DELAY
+    last_progress = None
+    polls = 0
+    while True:
+        polls += 1
+        try:
+            done, progress, result = check()
+        except (TciApiError, requests.exceptions.RequestException) as e:
+            echoerr(f"{label}: poll failed: {e}")
+            done, progress, result = False, last_progress, None
+        elapsed = time.monotonic() - start_time
+        if done:
+            return result, elapsed, polls
+        if progress != last_progress:
+            delay = INITIAL_DELAY
+            last_progress = progress
+        else:
+            delay = min(delay * BACKOFF_FACTOR, MAX_DELAY)
+        remaining = deadline - elapsed
+        if remaining <= 0:
+            return None, elapsed, polls
+        echoerr(f"{label}: {progress}, next poll in {min(delay, remaining):.0f}s ...")
+        time.sleep(min(delay, remaining))
+
+def wait_for_status(tci_client, status, app_id, app_name, deadline):
+    label = f"{app_name or app_id}"
+
+    def check():
+        current = tci_client.get_app_status(app_id)
+        progress = f"status {current.get('status')}, instance status {current.get('instanceStatus')}"
+        return current.get("status") == status, progress, current
+
+    result, elapsed, polls = poll(check, deadline, label)
+    record_metrics({"app_id": app_id, "app_name": app_name, "status": status, "reached": result is not None,
+                    "seconds": round(elapsed, 1), "polls": polls})
+    return result is not None
+
+def wait_for_app_id(tci_client, app_name, deadline):
+    def check():
+        app_id = tci_client.get_app_ids().get(app_name)
+        return app_id is not None, "not listed yet", app_id
+
+    app_id, elapsed, polls = poll(check, deadline, app_name)
+    record_metrics({"app_name": app_name, "app_id": app_id, "status": "listed", "reached": app_id is not None,
+                    "seconds": round(elapsed, 1), "polls": polls})
+    return app_id
+
+if __name__ == "__main__":
+    usage = ("Usage: python3 tci_wait.py status <status> <app_id>[=<app_name>] ...\n"
+             "       python3 tci_wait.py app-id <app_name>")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("status", "app-id") or (sys.argv[1] == "status" and len(sys.argv) < 4):
+        echoerr(usage)
+        exit(1)
+
+    tci_token = os.getenv("TCI_TOKEN")
+    if not tci_token:
+        echoerr("❌ TCI_TOKEN is not set.")
+        exit(1)
+
+    if sys.argv[1] == "app-id":
+        tci_client = TciClient(tci_token)
+        deadline = default_deadline("WAIT_FOR_APPID_RETRY_COUNT", "10", "WAIT_FOR_APPID_RETRY_DELAY", "60")
+        app_id = wait_for_app_id(tci_client, sys.argv[2], deadline)
+        if app_id is None:
+            echoerr(f"Reached deadline of {deadline:.0f}s while waiting for app {sys.argv[2]}")
+            exit(1)
+        print(app_id)
+        exit(0)
+
+    status = sys.argv[2]
+    apps = [app.partition("=")[::2] for app in sys.argv[3:]]
+    deadline = default_deadline("WAIT_FOR_STATUS_RETRY_COUNT", "120", "WAIT_FOR_STATUS_RETRY_DELAY", "5")
+    tci_client = TciClient(tci_token, pool_size=len(apps))
+    with ThreadPoolExecutor(max_workers=len(apps)) as executor:
+        futures = {executor.submit(wait_for_status, tci_client, status, app_id, app_name, deadline): app_id for app_id, app_name in apps}
+    failed = [futures[future] for future in futures if not future.result()]
+    if failed:
+        echoerr(f"Reached deadline of {deadline:.0f}s while waiting for status {status} of {', '.join(failed)}")
+        exit(1)
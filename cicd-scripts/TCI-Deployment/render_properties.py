@@ -0,0 +1,81 @@
+
+import os
+import re
+import sys
+import json
+
+# $NAME and ${NAME}, the references envsubst replaces
+ENV_REFERENCE = re.compile(r"\$(?:\{([A-Za-z_][A-Za-z0-9_]*)\}|([A-Za-z_][A-Za-z0-9_]*))")
+
+def read_lines(path):
+    with open(path, newline='') as file:
+        lines = file.read().split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+def parse_properties(lines):
+    """Returns {key: value} of key=value lines, keeping the first value of a duplicated key."""
+    properties = {}
+    for line in lines:
+        key, separator, value = line.partition("=")
+        if separator and key not in properties:
+            properties[key] = value
+    return properties
+
+def merge_properties(application_lines, shared_properties):
+    """Merges the way update_properties.sh does: the first line of the application file is dropped,
+    a key with a non-empty value in the shared module file takes that value, other key=value lines
+    are kept as they are and every other line becomes empty.
+    """
+    merged = []
+    for line in application_lines[1:]:
+        key, separator, _ = line.partition("=")
+        if not key:
+            continue
+        if shared_properties.get(key):
+            merged.append(f"{key}={shared_properties[key]}")
+        else:
+            merged.append(line if separator else "")
+    return merged
+
+def substitute(text, env=os.environ):
+    """envsubst: replaces $NAME and ${NAME} with the environment value, or nothing when unset."""
+    return ENV_REFERENCE.sub(lambda match: env.get(match.group(1) or match.group(2), ""), text)
+
+def render_properties(lines, env=os.environ):
+    """Builds the application-properties.json body like chc-render-application-properties.sh:
+    blank and comment lines are skipped, carriage returns removed and references substituted.
+    """
+    body = []
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        name, separator, value = substitute(line.replace("\r", ""), env).partition("=")
+        body.append({"name": name, "value": value.split("====")[0] if separator else None})
+    return body
+
+def write_lines(path, lines):
+    with open(path, "w", newline='') as file:
+        file.write("".join(f"{line}\n" for line in lines))
+
+def write_json(path, body):
+    with open(path, "w") as file:
+        json.dump(body, file, indent=2, ensure_ascii=False)
+        file.write("\n")
+
+if __name__ == "__main__":
+    usage = ("Usage: python3 render_properties.py merge <application_file> <sharedmodule_file>\n"
+             "       python3 render_properties.py render <application_file> <application_properties_json> [<sharedmodule_file>]")
+    if len(sys.argv) < 4 or sys.argv[1] not in ("merge", "render") or len(sys.argv) > (4 if sys.argv[1] == "merge" else 5):
+        print(usage, file=sys.stderr)
+        exit(1)
+
+    application_lines = read_lines(sys.argv[2])
+    if sys.argv[1] == "merge":
+        write_lines(sys.argv[2], merge_properties(application_lines, parse_properties(read_lines(sys.argv[3]))))
+    else:
+        if len(sys.argv) == 5:
+            # merge and render in one pass without rewriting the application file
+            application_lines = merge_properties(application_lines, parse_properties(read_lines(sys.argv[4])))
+        write_json(sys.argv[3], render_properties(application_lines))
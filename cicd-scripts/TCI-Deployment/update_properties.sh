@@ -14,34 +14,6 @@ do
     esac
 done
 
-# Array to store keys from dev.properties(application property file)
-declare -a dev_keys
-
-# Read dev.properties file and extract keys
-while IFS='=' read -r key _ || [[ -n "$key" ]]
-do
-  if [[ -n "$key" ]]; then
-    dev_keys+=("$key")
-  fi
-done < <(tail -n +2 ${application_file})
-
-updated_file="updated_app.properties"
-
-# Loop through the keys and process each one
-for key in "${dev_keys[@]}"
-do
-  # Search for the key in sharedmodule.properties
-  value=$(grep -E "^$key=" ${sharedmodule_file} | cut -d'=' -f2-)
-  
-  # If key exists in sharedmodule.properties, use its value
-  # Otherwise, use the value from dev.properties
-  if [[ -n "$value" ]]; then
-    echo "$key=$value" >> "$updated_file"
-  else
-    line=$(grep -E "^$key=" ${application_file})
-    echo "$line" >> "$updated_file"
-  fi
-done
-
-rm ${application_file}
-mv ${updated_file} ${application_file}
+# Keys of the application property file (first line skipped) take their value from the
+# shared module property file when it has one, see render_properties.py
+python3 "$(dirname "$0")/render_properties.py" merge "${application_file}" "${sharedmodule_file}"
@@ -0,0 +1,65 @@
+
+import os
+import json
+import time
+import threading
+from base64 import b64encode
+from nacl import encoding, public
+from github_client import GitHubClient
+
+def encrypt(public_key: str, secret_value: str) -> str:
+    public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
+    sealed_box = public.SealedBox(public_key)
+    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
+    return b64encode(encrypted).decode("utf-8")
+
+def sealed_box_for(public_key: str) -> public.SealedBox:
+    return public.SealedBox(public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder()))
+
+def encrypt_bundle(public_key: str, secrets: dict) -> dict:
+    """Encrypts every secret of the bundle with a single sealed box."""
+    sealed_box = sealed_box_for(public_key)
+    return {name: b64encode(sealed_box.encrypt(value.encode("utf-8"))).decode("utf-8") for name, value in secrets.items()}
+
+class PublicKeyCache:
+    """Caches Actions secrets public keys per owner path (e.g. "repos/<org>/<repo>").
+
+    Entries expire after ttl seconds and can be persisted to cache_file so that
+    subsequent runs skip the public-key round trip. Callers invalidate an entry
+    when GitHub rejects a key_id, so rotated keys are refetched.
+    """
+
+    def __init__(self, client: GitHubClient, ttl: int = 3600, cache_file: str = None):
+        self.client = client
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.keys = {}
+        self.lock = threading.Lock()
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file) as file:
+                self.keys = json.load(file)
+
+    def get(self, owner_path: str):
+        with self.lock:
+            entry = self.keys.get(owner_path)
+        if entry and entry["fetched_at"] + self.ttl > time.time():
+            return entry["key"], entry["key_id"]
+
+        response = self.client.get(f"/{owner_path}/actions/secrets/public-key")
+        if response.status_code != 200:
+            return None, None
+        key_data = response.json()
+        with self.lock:
+            self.keys[owner_path] = {"key": key_data["key"], "key_id": key_data["key_id"], "fetched_at": time.time()}
+        return key_data["key"], key_data["key_id"]
+
+    def invalidate(self, owner_path: str):
+        with self.lock:
+            self.keys.pop(owner_path, None)
+
+    def save(self):
+        if not self.cache_file:
+            return
+        with self.lock:
+            with open(self.cache_file, "w") as file:
+                json.dump(self.keys, file)
@@ -1,43 +1,45 @@
 
 import sys
 import csv
-import requests
 import json
+from github_client import GitHubClient
+from repo_policy import normalize_environment, diff_settings
 
 # Set your GitHub token and organization name
 org_name = sys.argv[1]
 github_token = sys.argv[2]
 repos_file = sys.argv[3]
+client = GitHubClient(github_token)
+
+# Desired setting of every protected environment, as sent to the PUT endpoint
+ENVIRONMENT_SETTING = {
+    "wait_timer": 30,
+    "prevent_self_review": False,
+    "reviewers": [
+        {"type": "Team", "id": 8431934}
+    ],
+    "deployment_branch_policy": {
+        "protected_branches": False,
+        "custom_branch_policies": True
+    }
+}
 
 def check_env_protection(repo_name, env_name):
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/environments/{env_name}"
     headers = {
-        "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.v3+json"
     }
 
-    response = requests.get(url, headers=headers)
+    response = client.get_cached(url, headers=headers)
     return response.status_code, response.json()
 
 def add_environment_setting(repo_name: str, env_name: str):
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/environments/{env_name}"
     headers = {
-        "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.ant-man-preview+json",  # Using preview header for environments API
         "Content-Type": "application/json"
     }
-    data = {
-        "wait_timer": 30,
-        "prevent_self_review": False,
-        "reviewers": [
-            {"type": "Team", "id": 8431934}
-        ],
-        "deployment_branch_policy": {
-            "protected_branches": False,
-            "custom_branch_policies": True
-        }
-    }
-    response = requests.put(url, headers=headers, json=data)
+    response = client.put(url, headers=headers, json=ENVIRONMENT_SETTING)
     if response.status_code == 200:
         print(f"Production environment updated for '{repo_name}' repository.")
     else:
@@ -46,14 +48,23 @@ def add_environment_setting(repo_name: str, env_name: str):
 def check_and_create_env_protection_rules(repo_name):
     env_to_protect = ["prod", "uat"]
     for env_name in env_to_protect:
-        #status_code, response_json = check_env_protection(repo_name, env_name)
-        #if status_code == 200:
-        #    print(f"env protection rules for '{env_name}' branch of '{repo_name}' are already in place.")
-        #elif status_code == 404:
-        #    add_branch_protection(repo_name, env_name)
-        #else:
-        #    print(f"Failed to check branch protection for '{env_name}' branch of '{repo_name}'. Error: {response_json}")
-       add_environment_setting(repo_name, env_name)
+        status_code, response_json = check_env_protection(repo_name, env_name)
+        if status_code == 200:
+            # only rewrite the environment when it drifted from the desired setting
+            drift = diff_settings(normalize_environment(ENVIRONMENT_SETTING), normalize_environment(response_json))
+        elif status_code == 404:
+            drift = ["environment: missing"]
+        else:
+            print(f"Failed to check '{env_name}' environment of '{repo_name}'. Error: {response_json}")
+            continue
+
+        if not drift:
+            print(f"Environment setting for '{env_name}' environment of '{repo_name}' is already in place.")
+            continue
+        print(f"Environment drift on '{env_name}' environment of '{repo_name}':")
+        for change in drift:
+            print(f"  {change}")
+        add_environment_setting(repo_name, env_name)
 
 with open(repos_file, newline='') as repos_file:
     repo_reader = csv.reader(repos_file)
@@ -68,4 +79,5 @@ for repo_row in repo_names:
     else:
         print(f"Skipping invalid repo row: {repo_row}")
 
+client.print_stats()
 print("Finished checking and creating environment setting for all repositories.")
@@ -1,81 +1,101 @@
 
+import os
 import sys
 import csv
-import requests
 import json
+from github_client import GitHubClient
+from repo_policy import normalize_branch_protection, diff_settings, branch_protection_from_rule
+import github_graphql
 
 # Set your GitHub token and organization name
 org_name = sys.argv[1]
 github_token = sys.argv[2]
 repos_file = sys.argv[3]
+# --plan only reports drifted branches without writing them
+plan_mode = "--plan" in sys.argv[4:]
+client = GitHubClient(github_token)
+# "graphql" reads the protection rules of every repository up front in batched queries and only
+# falls back to the REST GET for branches covered by a wildcard rule
+precheck = os.getenv("GITHUB_PRECHECK", "rest")
+
+# Desired protection for every protected branch, as sent to the PUT endpoint
+BRANCH_PROTECTION = {
+    "required_status_checks": {
+        "strict": True,
+        "contexts": []
+    },
+    "enforce_admins": True,
+    "required_pull_request_reviews": {
+        "dismissal_restrictions": {
+            "users": [
+            ],
+            "teams": [
+                "Opella-TCI-AIMS-Support",
+                "Opella-TCI-AMS-Support",
+                "Opella-TCI-Codeowners",
+                "CHC-Accenture-developers"
+            ]
+        },
+        "dismiss_stale_reviews": False,
+        "require_code_owner_reviews": True,
+        "required_approving_review_count": 1,
+        "require_last_push_approval": False,
+        "bypass_pull_request_allowances": {
+            "users": [
+            ],
+            "teams": [
+                "Opella-TCI-AIMS-Support",
+                "Opella-TCI-AMS-Support",
+                "Opella-TCI-Codeowners",
+                "CHC-Accenture-developers"
+            ]
+        }
+    },
+    "restrictions": {
+        "users": [
+        ],
+        "teams": [
+            "Opella-TCI-AIMS-Support",
+            "Opella-TCI-AMS-Support",
+            "Opella-TCI-Codeowners",
+            "CHC-Accenture-developers"
+        ]
+    },
+    "required_linear_history": True,
+    "allow_force_pushes": False,
+    "allow_deletions": False,
+    "block_creations": False,
+    "required_conversation_resolution": True,
+    "lock_branch": False
+}
 
 def check_branch_protection(repo_name, branch_name):
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/branches/{branch_name}/protection"
     headers = {
-        "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.v3+json"
     }
 
-    response = requests.get(url, headers=headers)
+    response = client.get_cached(url, headers=headers)
     return response.status_code, response.json()
 
+def current_branch_protection(repo_name, branch_name):
+    """Answers from the prefetched repository state when there is one, from the REST API otherwise."""
+    state = states.get(repo_name)
+    if state is not None and state.exists:
+        rule = state.protection_rule(branch_name)
+        if rule is not None:
+            return 200, branch_protection_from_rule(rule)
+        if not state.has_matching_rule(branch_name):
+            return 404, {}
+    return check_branch_protection(repo_name, branch_name)
+
 # Function to add branch protection rules
 def add_branch_protection(repo_name: str, branch_name: str)-> str:
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/branches/{branch_name}/protection"
     headers = {
-        "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.v3+json"
     }
-    data = {
-        "required_status_checks": {
-            "strict": True,
-            "contexts": []
-        },
-        "enforce_admins": True,
-        "required_pull_request_reviews": {
-            "dismissal_restrictions": {
-                "users": [
-                ],
-                "teams": [
-                    "Opella-TCI-AIMS-Support",
-                    "Opella-TCI-AMS-Support",
-                    "Opella-TCI-Codeowners",
-                    "CHC-Accenture-developers"
-                ]
-            },
-            "dismiss_stale_reviews": False,
-            "require_code_owner_reviews": True,
-            "required_approving_review_count": 1,
-            "require_last_push_approval": False,
-            "bypass_pull_request_allowances": {
-                "users": [
-                ],
-                "teams": [
-                    "Opella-TCI-AIMS-Support",
-                    "Opella-TCI-AMS-Support",
-                    "Opella-TCI-Codeowners",
-                    "CHC-Accenture-developers"
-                ]
-            }
-        },
-        "restrictions": {
-            "users": [
-            ],
-            "teams": [
-                "Opella-TCI-AIMS-Support",
-                "Opella-TCI-AMS-Support",
-                "Opella-TCI-Codeowners",
-                "CHC-Accenture-developers"
-            ]
-        },
-        "required_linear_history": True,
-        "allow_force_pushes": False,
-        "allow_deletions": False,
-        "block_creations": False,
-        "required_conversation_resolution": True,
-        "lock_branch": False
-    }
-    response = requests.put(url, headers=headers, json=data)
+    response = client.put(url, headers=headers, json=BRANCH_PROTECTION)
     if response.status_code == 200:
         print(f"Branch protection added to '{branch_name}' branch of '{repo_name}'.")
     else:
@@ -84,15 +104,29 @@ def add_branch_protection(repo_name: str, branch_name: str)-> str:
 def check_and_create_protection_rules(repo_name):
     branches_to_protect = ["main", "development"]
     for branch_name in branches_to_protect:
-        status_code, response_json = check_branch_protection(repo_name, branch_name)
+        status_code, response_json = current_branch_protection(repo_name, branch_name)
         if status_code == 200:
-          #  print(f"Branch protection rules for '{branch_name}' branch of '{repo_name}' are already in place.") 
-          # added this to update protection policy without deleting it 19/6
-            add_branch_protection(repo_name, branch_name)
+            # only rewrite the protection when it drifted from the desired payload
+            drift = diff_settings(normalize_branch_protection(BRANCH_PROTECTION), normalize_branch_protection(response_json))
         elif status_code == 404:
-            add_branch_protection(repo_name, branch_name)
+            drift = ["branch protection: missing"]
         else:
             print(f"Failed to check branch protection for '{branch_name}' branch of '{repo_name}'. Error: {response_json}")
+            continue
+
+        if not drift:
+            print(f"Branch protection rules for '{branch_name}' branch of '{repo_name}' are already in place.")
+            drift_report["in_sync"] += 1
+            continue
+
+        print(f"Branch protection drift on '{branch_name}' branch of '{repo_name}':")
+        for change in drift:
+            print(f"  {change}")
+        drift_report["drifted"] += 1
+        if not plan_mode:
+            add_branch_protection(repo_name, branch_name)
+
+drift_report = {"in_sync": 0, "drifted": 0}
 
 with open(repos_file, newline='') as repos_file:
         repo_reader = csv.reader(repos_file)
@@ -100,6 +134,10 @@ with open(repos_file, newline='') as repos_file:
 
         repo_names = list(repo_reader)
 
+states = {}
+if precheck == "graphql":
+    states = github_graphql.fetch_repo_states(client, org_name, [repo_row[0].strip() for repo_row in repo_names if len(repo_row) >= 2], branches=())
+
 for repo_row in repo_names:
     if len(repo_row) >= 2:
         repo_name = repo_row[0].strip()
@@ -107,5 +145,10 @@ for repo_row in repo_names:
     else:
         print(f"Skipping invalid repo row: {repo_row}")
 
+client.print_stats()
+if plan_mode:
+    print(f"Plan: {drift_report['drifted']} branches to update, {drift_report['in_sync']} already in place.")
+else:
+    print(f"Updated {drift_report['drifted']} branches, {drift_report['in_sync']} already in place.")
 print("Finished checking and creating branch protection for all repositories.")
 
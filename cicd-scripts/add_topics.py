@@ -1,24 +1,28 @@
 
-import requests
+import os
 import sys
 import csv
+from github_client import GitHubClient
+import github_graphql
 
 # Set your GitHub token and organization name
 org_name = sys.argv[1]
 github_token = sys.argv[2]
 repos_file = sys.argv[3]
+client = GitHubClient(github_token)
+# "graphql" reads the current topics of every repository in batched queries and skips the ones already tagged
+precheck = os.getenv("GITHUB_PRECHECK", "rest")
 
 def update_repo_topics(repo_name: str, topics: list):
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/topics"
     headers = {
-        "Authorization": f"Bearer {github_token}",
         "Accept": "application/vnd.github.mercy-preview+json",  # Use preview header for topics API
         "Content-Type": "application/json"
     }
     data = {
         "names": topics
     }
-    response = requests.put(url, headers=headers, json=data)
+    response = client.put(url, headers=headers, json=data)
     if response.status_code == 200:
         print(f"Topics updated for '{repo_name}' repository.")
     else:
@@ -31,13 +35,22 @@ with open(repos_file, newline='') as repos_file:
 
     repo_names = list(repo_reader)
 
+states = {}
+if precheck == "graphql":
+    states = github_graphql.fetch_repo_states(client, org_name, [repo_row[0].strip() for repo_row in repo_names if len(repo_row) >= 2], branches=())
+
 # Loop through each repository and update its topics
 for repo_row in repo_names:
     if len(repo_row) >= 2:
         repo_name = repo_row[0].strip()
         topics = ["cc-F5A3111056"]  # Replace with your desired topics
+        state = states.get(repo_name)
+        if state is not None and state.exists and set(state.topics) == set(topics):
+            print(f"Topics already up to date for '{repo_name}' repository.")
+            continue
         update_repo_topics(repo_name, topics)
     else:
         print(f"Skipping invalid repo row: {repo_row}")
 
+client.print_stats()
 print("Finished updating topics for all repositories.")
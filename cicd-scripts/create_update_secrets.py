@@ -1,29 +1,52 @@
 
+import os
 import sys
 import csv
+import time
 import requests
 import json
-from base64 import b64encode
-from nacl import encoding, public
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from github_client import GitHubClient
+from actions_secrets import PublicKeyCache, encrypt, encrypt_bundle
+from secret_ledger import SecretLedger
+import github_graphql
 
-def encrypt(public_key: str, secret_value: str) -> str:
-    public_key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-    sealed_box = public.SealedBox(public_key)
-    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
-    return b64encode(encrypted).decode("utf-8")
+# Number of parallel workers used to fan out across repos and secrets
+max_workers = int(os.getenv("SECRETS_MAX_WORKERS", "8"))
+# Machine-readable per-repo results written at the end of the run
+summary_file = os.getenv("SECRETS_SUMMARY_FILE", "secrets_summary.json")
+# Optional file persisting repo public keys between runs, and their time to live in seconds
+public_key_cache_file = os.getenv("SECRETS_PUBLIC_KEY_CACHE")
+public_key_ttl = int(os.getenv("SECRETS_PUBLIC_KEY_TTL", "3600"))
+# Optional ledger of pushed secret hashes used to skip unchanged secrets, and its salt
+ledger_file = os.getenv("SECRETS_LEDGER_FILE")
+ledger_salt = os.getenv("SECRETS_LEDGER_SALT")
+# Push every secret even when the ledger says it is unchanged
+force_sync = os.getenv("SECRETS_FORCE_SYNC", "false").lower() == "true"
+# "repo" writes every secret into every repository, "org" writes shared secrets once as organization
+# secrets visible to the selected repositories
+secrets_scope = os.getenv("SECRETS_SCOPE", "repo")
+# Comma separated secrets still written per repository in "org" scope
+repo_secret_names = [name.strip() for name in os.getenv("SECRETS_REPO_SPECIFIC", "").split(",") if name.strip()]
+# Make the selected repositories exactly the repos file instead of adding the missing ones
+prune_selected = os.getenv("SECRETS_ORG_PRUNE", "false").lower() == "true"
+# Delete repository copies of organization secrets, which would otherwise shadow them; without it
+# they are only reported as shadowed_by_repo_secret
+remove_repo_copies = os.getenv("SECRETS_REMOVE_REPO_COPIES", "false").lower() == "true"
 
-def create_or_update_secret(public_key: str, secret_value: str, org_name: str, repo_name: str, secret_name: str, github_token: str, key_id: str, encrypted_value: str):
+def get_public_key(key_cache: PublicKeyCache, org_name: str, repo_name: str):
+    public_key, key_id = key_cache.get(f"repos/{org_name}/{repo_name}")
+    if public_key is None:
+        print(f"Failed to fetch public key for repository: {repo_name}")
+    return public_key, key_id
+
+def create_or_update_secret(client: GitHubClient, org_name: str, repo_name: str, secret_name: str, key_id: str, encrypted_value: str) -> int:
     url = f"https://api.github.com/repos/{org_name}/{repo_name}/actions/secrets/{secret_name}"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {github_token}",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
     data = {
         "encrypted_value": encrypted_value,
         "key_id": str(key_id)
     }
-    response = requests.put(url, headers=headers, data=json.dumps(data))
+    response = client.put(url, data=json.dumps(data))
     if response.status_code == 201:
         print(f"Secret {secret_name} added in {repo_name}")
     elif response.status_code == 204:
@@ -31,6 +54,216 @@ def create_or_update_secret(public_key: str, secret_value: str, org_name: str, r
     else:
         print(f"Failed to create/update secret {secret_name} in {repo_name}. Response: {response.status_code}")
         print(response.text)
+    return response.status_code
+
+def push_secret(client: GitHubClient, key_cache: PublicKeyCache, org_name: str, repo_name: str, secret_name: str, secret_value: str, key_id: str, encrypted_value: str):
+    status_code = create_or_update_secret(client, org_name, repo_name, secret_name, key_id, encrypted_value)
+    if status_code == 422:
+        # the cached key was rotated: refetch it and encrypt again
+        print(f"Refreshing public key for repository: {repo_name}")
+        key_cache.invalidate(f"repos/{org_name}/{repo_name}")
+        public_key, key_id = get_public_key(key_cache, org_name, repo_name)
+        if public_key is not None:
+            status_code = create_or_update_secret(client, org_name, repo_name, secret_name, key_id, encrypt(public_key, secret_value))
+    return status_code, key_id
+
+def rollout_secrets(client: GitHubClient, key_cache: PublicKeyCache, ledger, org_name: str, repo_names: list, secrets: dict) -> dict:
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # fetch every repo public key in parallel
+        key_futures = {}
+        for repo_row in repo_names:
+            if len(repo_row) >= 2:
+                repo_name = repo_row[0].strip()
+                print("Processing Repo:", repo_name)
+                results[repo_name] = {"status": "pending", "secrets": {}}
+                key_futures[executor.submit(get_public_key, key_cache, org_name, repo_name)] = repo_name
+            else:
+                print(f"Skipping invalid repo row: {repo_row}")
+
+        # then fan out one task per repo and secret
+        secret_futures = {}
+        for future in as_completed(key_futures):
+            repo_name = key_futures[future]
+            try:
+                public_key, key_id = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to fetch public key for repository: {repo_name}. Error: {e}")
+                public_key, key_id = None, None
+            if public_key is None:
+                results[repo_name]["status"] = "public_key_failed"
+                continue
+            bundle = {}
+            for secret_name, secret_value in secrets.items():
+                if len(secret_value) < 1:
+                    print(f"Skipping invalid secret value: {secret_name}")
+                    results[repo_name]["secrets"][secret_name] = "skipped"
+                elif ledger and not force_sync and ledger.is_current(f"{org_name}/{repo_name}", secret_name, secret_value, key_id):
+                    results[repo_name]["secrets"][secret_name] = "unchanged"
+                else:
+                    bundle[secret_name] = secret_value
+            encrypted_bundle = encrypt_bundle(public_key, bundle)
+            for secret_name, encrypted_value in encrypted_bundle.items():
+                future = executor.submit(push_secret, client, key_cache, org_name, repo_name, secret_name, bundle[secret_name], key_id, encrypted_value)
+                secret_futures[future] = (repo_name, secret_name)
+
+        for future in as_completed(secret_futures):
+            repo_name, secret_name = secret_futures[future]
+            try:
+                status_code, key_id = future.result()
+                outcome = {201: "added", 204: "updated"}.get(status_code, f"failed:{status_code}")
+                if ledger and status_code in (201, 204):
+                    ledger.record(f"{org_name}/{repo_name}", secret_name, secrets[secret_name], key_id)
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to create/update secret {secret_name} in {repo_name}. Error: {e}")
+                outcome = "failed:error"
+            results[repo_name]["secrets"][secret_name] = outcome
+
+    for repo_name, result in results.items():
+        if result["status"] == "pending":
+            failed = [name for name, outcome in result["secrets"].items() if outcome.startswith("failed")]
+            result["status"] = "failed" if failed else "ok"
+    return results
+
+def get_selected_repository_ids(client: GitHubClient, org_name: str, secret_name: str):
+    """Ids of the repositories an organization secret is visible to, None when the secret does not exist
+    or its visibility is not "selected" (GitHub answers 409), so it gets written again with that visibility.
+    """
+    selected, page = set(), 1
+    while True:
+        response = client.get(f"/orgs/{org_name}/actions/secrets/{secret_name}/repositories", params={"per_page": 100, "page": page})
+        if response.status_code in (404, 409):
+            return None
+        if response.status_code != 200:
+            raise requests.exceptions.RequestException(f"{response.status_code}: {response.text}")
+        repositories = response.json()["repositories"]
+        selected.update(repository["id"] for repository in repositories)
+        if len(repositories) < 100:
+            return selected
+        page += 1
+
+def put_org_secret(client: GitHubClient, key_cache: PublicKeyCache, org_name: str, secret_name: str, secret_value: str, repository_ids: list):
+    status_code, key_id = None, None
+    for attempt in range(2):
+        public_key, key_id = key_cache.get(f"orgs/{org_name}")
+        if public_key is None:
+            print(f"Failed to fetch public key for organization: {org_name}")
+            return None, None
+        data = {
+            "encrypted_value": encrypt(public_key, secret_value),
+            "key_id": str(key_id),
+            "visibility": "selected",
+            "selected_repository_ids": repository_ids
+        }
+        status_code = client.put(f"/orgs/{org_name}/actions/secrets/{secret_name}", json=data).status_code
+        if status_code != 422:
+            break
+        # the cached key was rotated: refetch it and encrypt again
+        key_cache.invalidate(f"orgs/{org_name}")
+    return status_code, key_id
+
+def sync_org_secret(client: GitHubClient, key_cache: PublicKeyCache, ledger, org_name: str, secret_name: str, secret_value: str, repository_ids: set) -> str:
+    """Writes the organization secret when its value changed, otherwise only its repository list when that changed."""
+    selected = get_selected_repository_ids(client, org_name, secret_name)
+    desired = repository_ids if prune_selected or selected is None else selected | repository_ids
+    _, key_id = key_cache.get(f"orgs/{org_name}")
+    value_current = ledger and not force_sync and key_id and ledger.is_current(org_name, secret_name, secret_value, key_id)
+
+    if selected is None or not value_current:
+        status_code, key_id = put_org_secret(client, key_cache, org_name, secret_name, secret_value, sorted(desired))
+        if status_code not in (201, 204):
+            print(f"Failed to create/update organization secret {secret_name}. Response: {status_code}")
+            return f"failed:{status_code}"
+        if ledger:
+            ledger.record(org_name, secret_name, secret_value, key_id)
+        print(f"Organization secret {secret_name} {'added' if status_code == 201 else 'updated'} for {len(desired)} repositories")
+        return "added" if status_code == 201 else "updated"
+
+    if desired == selected:
+        return "unchanged"
+    response = client.put(f"/orgs/{org_name}/actions/secrets/{secret_name}/repositories", json={"selected_repository_ids": sorted(desired)})
+    if response.status_code != 204:
+        print(f"Failed to update repositories of organization secret {secret_name}. Response: {response.status_code}")
+        print(response.text)
+        return f"failed:{response.status_code}"
+    print(f"Organization secret {secret_name} now visible to {len(desired)} repositories")
+    return "repositories_updated"
+
+def check_repo_copies(client: GitHubClient, org_name: str, repo_name: str, secret_names: list) -> dict:
+    """Finds the repository secrets named like organization secrets, which take precedence over them,
+    and deletes them when SECRETS_REMOVE_REPO_COPIES is set.
+
+    Returns {"shadowed_by_repo_secret": [...], "removed_repo_copies": [...]}.
+    """
+    response = client.get(f"/repos/{org_name}/{repo_name}/actions/secrets", params={"per_page": 100})
+    if response.status_code != 200:
+        raise requests.exceptions.RequestException(f"listing secrets of {repo_name} returned {response.status_code}: {response.text}")
+    shadowed, removed = [], []
+    for secret in response.json()["secrets"]:
+        if secret["name"] not in secret_names:
+            continue
+        if remove_repo_copies and client.delete(f"/repos/{org_name}/{repo_name}/actions/secrets/{secret['name']}").status_code == 204:
+            print(f"Secret {secret['name']} removed from {repo_name}, the organization secret applies")
+            removed.append(secret["name"])
+        else:
+            shadowed.append(secret["name"])
+    if shadowed:
+        print(f"Repository secrets {', '.join(shadowed)} of {repo_name} shadow the organization secrets")
+    return {"shadowed_by_repo_secret": shadowed, "removed_repo_copies": removed}
+
+def rollout_org_secrets(client: GitHubClient, key_cache: PublicKeyCache, ledger, org_name: str, repo_names: list, secrets: dict) -> dict:
+    """Writes the shared secrets once as organization secrets selected for the repos, and the
+    SECRETS_REPO_SPECIFIC ones per repository with rollout_secrets.
+    """
+    names = [repo_row[0].strip() for repo_row in repo_names if len(repo_row) >= 2]
+    database_ids = github_graphql.fetch_repository_ids(client, org_name, names)
+    repository_ids = {database_id for database_id in database_ids.values() if database_id is not None}
+    missing = [name for name in names if database_ids[name] is None]
+    for repo_name in missing:
+        print(f"Repository {repo_name} not found, it is not selected for the organization secrets")
+
+    org_secrets = {name: value for name, value in secrets.items() if name not in repo_secret_names}
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for secret_name, secret_value in org_secrets.items():
+            if len(secret_value) < 1:
+                print(f"Skipping invalid secret value: {secret_name}")
+                outcomes[secret_name] = "skipped"
+            else:
+                futures[executor.submit(sync_org_secret, client, key_cache, ledger, org_name, secret_name, secret_value, repository_ids)] = secret_name
+        for future in as_completed(futures):
+            try:
+                outcomes[futures[future]] = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to create/update organization secret {futures[future]}. Error: {e}")
+                outcomes[futures[future]] = "failed:error"
+
+        futures = {executor.submit(check_repo_copies, client, org_name, repo_name, list(org_secrets)): repo_name
+                   for repo_name in names if repo_name not in missing}
+        copies = {}
+        for future in as_completed(futures):
+            try:
+                copies[futures[future]] = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to check repository secrets of {futures[future]}. Error: {e}")
+                copies[futures[future]] = {"copies_check": "failed:error"}
+
+    repo_secrets = {name: value for name, value in secrets.items() if name in repo_secret_names}
+    results = rollout_secrets(client, key_cache, ledger, org_name, repo_names, repo_secrets) if repo_secrets else {}
+    for repo_name in names:
+        result = results.setdefault(repo_name, {"status": "ok", "secrets": {}})
+        if repo_name in missing:
+            result["status"] = "not_found"
+        for key, value in copies.get(repo_name, {}).items():
+            if value:
+                result[key] = value
+        if result.get("copies_check") and result["status"] == "ok":
+            result["status"] = "failed"
+        # workflows of this repo still read the repository copies, not the rotated organization secrets
+        if result.get("shadowed_by_repo_secret") and result["status"] == "ok":
+            result["status"] = "shadowed"
+    return {"org_secrets": outcomes, "repos": results}
 
 if __name__ == "__main__":
     org_name = sys.argv[1]
@@ -60,36 +293,43 @@ if __name__ == "__main__":
         "UAT_TCI_CLIENT_ID": sys.argv[14],
         "UAT_TCI_CLIENT_SECRET": sys.argv[15],
         "PROD_TCI_CLIENT_ID": sys.argv[16],
-        "PROD_TCI_CLIENT_SECRET": sys.argv[17]        
+        "PROD_TCI_CLIENT_SECRET": sys.argv[17]
     }
 
-    for repo_row in repo_names:
-        if len(repo_row) >= 2:
-            repo_name = repo_row[0].strip()
-
-            print("Processing Repo:", repo_name)
-
-            public_key_url = f"https://api.github.com/repos/{org_name}/{repo_name}/actions/secrets/public-key"
-            headers = {
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {github_token}",
-                "X-GitHub-Api-Version": "2022-11-28"
-            }
-            response = requests.get(public_key_url, headers=headers)
-
-            if response.status_code == 200:
-                key_data = response.json()
-                public_key = key_data["key"]
-                key_id = key_data["key_id"]
-
-                for secret_name, secret_value in secrets.items():
-                    if len(secret_value) >= 1:
-                        encrypted_value = encrypt(public_key, secret_value)
-                        create_or_update_secret(public_key, secret_value, org_name, repo_name, secret_name, github_token, key_id, encrypted_value)
-                    else:
-                        print(f"Skipping invalid secret value: {secret_name}")
-            else:
-                print(f"Failed to fetch public key for repository: {repo_name}")
-        else:
-            print(f"Skipping invalid repo row: {repo_row}")
+    client = GitHubClient(github_token, pool_size=max_workers)
+    key_cache = PublicKeyCache(client, ttl=public_key_ttl, cache_file=public_key_cache_file)
+    start_time = time.monotonic()
+    ledger = SecretLedger(ledger_file, ledger_salt) if ledger_file else None
+    org_results = None
+    if secrets_scope == "org":
+        org_results = rollout_org_secrets(client, key_cache, ledger, org_name, repo_names, secrets)
+        results = org_results["repos"]
+    else:
+        results = rollout_secrets(client, key_cache, ledger, org_name, repo_names, secrets)
+    key_cache.save()
+    if ledger:
+        ledger.save()
+    elapsed = round(time.monotonic() - start_time, 2)
+
+    summary = {
+        "org": org_name,
+        "workers": max_workers,
+        "elapsed_seconds": elapsed,
+        "repos_ok": sum(1 for result in results.values() if result["status"] == "ok"),
+        "repos_failed": sum(1 for result in results.values() if result["status"] not in ("ok", "shadowed")),
+        "repos": results
+    }
+    if org_results is not None:
+        summary["org_secrets"] = org_results["org_secrets"]
+        summary["repos_shadowed"] = sum(1 for result in results.values() if result["status"] == "shadowed")
+    with open(summary_file, "w") as file:
+        json.dump(summary, file, indent=2)
+
+    client.print_stats()
+    print(f"Summary: {summary['repos_ok']} repos ok, {summary['repos_failed']} repos failed in {elapsed}s (written to {summary_file})")
+    if org_results is not None:
+        org_failed = [name for name, outcome in org_results["org_secrets"].items() if outcome.startswith("failed")]
+        print(f"Organization secrets: {len(org_results['org_secrets']) - len(org_failed)} ok, {len(org_failed)} failed")
+        if summary["repos_shadowed"]:
+            print(f"{summary['repos_shadowed']} repos keep repository secrets that shadow the organization secrets (set SECRETS_REMOVE_REPO_COPIES=true to delete them)")
     print("Finished processing all repositories and secrets.")
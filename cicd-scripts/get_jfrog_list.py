@@ -1,46 +1,173 @@
 
+import os
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import csv
 import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-def get_ear_info(api_key, base_url, csv_file):
-    headers = {
-        "X-JFrog-Art-Api": api_key
-    }
+# Number of folders listed in parallel
+max_workers = int(os.getenv("JFROG_MAX_WORKERS", "8"))
+# Try Artifactory's deep file list (?list&deep=1) to fetch the whole tree in one call
+deep_list = os.getenv("JFROG_DEEP_LIST", "false").lower() == "true"
+# Optional index of the previous listing used for the delta report; when it exists the deep
+# file list is tried first so a refresh is a single call
+snapshot_file = os.getenv("JFROG_SNAPSHOT_FILE")
+
+# Every interface folder is descended into this sub path
+INTERFACE_SUB_PATH = "Development/Dev-1/"
+
+class EarInventory:
+    """Collects the listing of the current run and compares it with the previous snapshot.
+
+    Rows are streamed to the CSV writer as they are found. Every folder is always listed:
+    a folder's lastModified does not change when an EAR is added deeper in its subtree.
+    """
+
+    def __init__(self, writer, previous=None):
+        self.writer = writer
+        self.previous = previous or {}
+        self.folders = {}
+        self.unlisted = []
+
+    def folder(self, folder_url):
+        return self.folders.setdefault(folder_url, {"ears": []})
+
+    def add_ear(self, folder_url, item):
+        ear = {
+            "name": item["uri"].split("/")[-1],
+            "size": item.get("size"),
+            "lastModified": item.get("lastModified"),
+            "checksum": item.get("sha1")
+        }
+        self.folder(folder_url)["ears"].append(ear)
+        self.writer.writerow([folder_url, ear["name"], ear["size"]])
 
-    response = requests.get(base_url, headers=headers)
+    def carry_forward(self, folder_url):
+        """Keeps the previous EARs of a folder that could not be listed, and of its whole subtree,
+        so the delta does not report them as removed.
+        """
+        self.unlisted.append(folder_url)
+        for url, previous_folder in self.previous.items():
+            if url.startswith(folder_url) and url not in self.folders:
+                self.folders[url] = {"ears": list(previous_folder["ears"])}
+
+    def delta(self):
+        previous_ears = {(url, ear["name"]): ear for url, folder in self.previous.items() for ear in folder["ears"]}
+        current_ears = {(url, ear["name"]): ear for url, folder in self.folders.items() for ear in folder["ears"]}
+        rows = []
+        for key in sorted(current_ears.keys() - previous_ears.keys()):
+            rows.append(["added", key[0], key[1], "", current_ears[key]["size"]])
+        for key in sorted(previous_ears.keys() - current_ears.keys()):
+            rows.append(["removed", key[0], key[1], previous_ears[key]["size"], ""])
+        for key in sorted(current_ears.keys() & previous_ears.keys()):
+            current, previous = current_ears[key], previous_ears[key]
+            if current["size"] != previous["size"]:
+                rows.append(["resized", key[0], key[1], previous["size"], current["size"]])
+            elif any(current[field] and previous[field] and current[field] != previous[field] for field in ("checksum", "lastModified")):
+                rows.append(["replaced", key[0], key[1], previous["size"], current["size"]])
+        return rows
+
+def create_session(api_key, pool_size):
+    session = requests.Session()
+    session.headers.update({"X-JFrog-Art-Api": api_key})
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
+def list_folder(session, folder_url):
+    response = session.get(folder_url)
 
     if response.status_code == 200:
         try:
-            data = response.json()
-            with open(csv_file, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                for item in data["children"]:
-                    if item["folder"]:
-                        interface_name = item["uri"]
-                        interface_url = f"{base_url}{interface_name}/Development/Dev-1/"
-                        get_ear_info(api_key, interface_url, csv_file)
-                    else:
-                        ear_name = item["uri"].split("/")[-1]
-                        ear_size = item["size"]
-                        writer.writerow([base_url, ear_name, ear_size])
+            return response.json()
         except requests.exceptions.JSONDecodeError as e:
             print(f"Error: Unable to parse JSON response. {e}")
             print(f"Raw response: {response.text}")
     else:
         print(f"Error: Unable to retrieve data. Status code {response.status_code}")
+    return None
+
+def crawl_ear_info(session, base_url, inventory):
+    """Walks the folder tree with a bounded pool of concurrent listings, streaming rows to the inventory."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(list_folder, session, base_url): base_url}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder_url = pending.pop(future)
+                data = future.result()
+                if data is None:
+                    inventory.carry_forward(folder_url)
+                    continue
+                for item in data["children"]:
+                    if item["folder"]:
+                        interface_name = item["uri"]
+                        interface_url = f"{folder_url}{interface_name}/{INTERFACE_SUB_PATH}"
+                        pending[executor.submit(list_folder, session, interface_url)] = interface_url
+                    else:
+                        inventory.add_ear(folder_url, item)
+
+def deep_list_ear_info(session, base_url, inventory) -> bool:
+    """Fetches the whole subtree with one deep file list call. Returns False when it is not available."""
+    separator = "&" if "?" in base_url else "?"
+    data = list_folder(session, f"{base_url}{separator}list&deep=1&listFolders=0")
+    if data is None or "files" not in data:
+        return False
+
+    for item in data["files"]:
+        parts = item["uri"].strip("/").split("/")
+        folder_url = base_url
+        # keep only files reachable the way the folder crawl descends: <folder>/Development/Dev-1/...
+        while len(parts) > 1 and parts[1:3] == INTERFACE_SUB_PATH.strip("/").split("/"):
+            folder_url = f"{folder_url}/{parts[0]}/{INTERFACE_SUB_PATH}"
+            parts = parts[3:]
+        if len(parts) == 1:
+            inventory.add_ear(folder_url, item)
+    return True
+
+def get_ear_info(api_key, base_url, csv_file):
+    session = create_session(api_key, max_workers)
+    previous = {}
+    if snapshot_file and os.path.exists(snapshot_file):
+        with open(snapshot_file) as file:
+            previous = json.load(file).get("folders", {})
+
+    with open(csv_file, mode='a', newline='') as file:
+        inventory = EarInventory(csv.writer(file), previous)
+        use_deep_list = deep_list or bool(previous)
+        if not (use_deep_list and deep_list_ear_info(session, base_url, inventory)):
+            if use_deep_list:
+                print("Deep listing not available, crawling folders instead")
+            crawl_ear_info(session, base_url, inventory)
+
+    if snapshot_file:
+        delta_csv = f"{os.path.splitext(csv_file)[0]}_delta.csv"
+        delta_rows = inventory.delta()
+        with open(delta_csv, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Change", "Interface", "Ear Name", "Old Size", "New Size"])
+            writer.writerows(delta_rows)
+        print(f"{len(delta_rows)} EAR changes since the previous snapshot written to {delta_csv}")
+        with open(snapshot_file, mode='w') as file:
+            json.dump({"base_url": base_url, "complete": not inventory.unlisted, "folders": inventory.folders}, file, indent=2)
+    if inventory.unlisted:
+        print(f"Warning: incomplete listing, {len(inventory.unlisted)} folders could not be listed and are missing from {csv_file}:")
+        for folder_url in sorted(inventory.unlisted):
+            print(f"  {folder_url}")
 
 if __name__ == "__main__":
     if len(sys.argv) != 4:
         print("Usage: python script.py <api_key> <base_url> <output_csv>")
         sys.exit(1)
-        
+
     api_key = sys.argv[1]
     base_url = sys.argv[2]
     output_csv = sys.argv[3]
-    
+
     with open(output_csv, mode='w', newline='') as file:
         writer = csv.writer(file)
         writer.writerow(["Interface", "Ear Name", "Size"])
-    
+
     get_ear_info(api_key, base_url, output_csv)
@@ -0,0 +1,227 @@
+
+import os
+import re
+import json
+import time
+import hashlib
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.github.com"
+
+# Collapse the variable parts of a REST path so stats are grouped per endpoint
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"^/orgs/[^/]+"), "/orgs/{org}"),
+    (re.compile(r"/teams/[^/]+"), "/teams/{team}"),
+    (re.compile(r"/branches/[^/]+"), "/branches/{branch}"),
+    (re.compile(r"/environments/[^/]+"), "/environments/{env}"),
+    (re.compile(r"/secrets/(?!public-key)[^/]+"), "/secrets/{secret}"),
+]
+
+class GitHubClient:
+    """Thread-safe GitHub REST client shared by the cicd scripts.
+
+    Keeps a pooled keep-alive session, retries 5xx and rate-limited calls with
+    jittered backoff, slows down when X-RateLimit-Remaining gets low and keeps
+    a request count and latency per endpoint. get_cached() revalidates responses
+    stored in cache_dir (GITHUB_HTTP_CACHE_DIR by default) with ETag/Last-Modified.
+    """
+
+    def __init__(self, github_token: str, pool_size: int = 10, max_retries: int = 5, min_remaining: int = 100, timeout: int = 30, cache_dir: str = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {github_token}",
+            "X-GitHub-Api-Version": "2022-11-28"
+        })
+        self.max_retries = max_retries
+        self.min_remaining = min_remaining
+        self.timeout = timeout
+        self.rate_remaining = None
+        self.rate_reset = None
+        self.stats = {}
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+        self.cache_dir = cache_dir or os.getenv("GITHUB_HTTP_CACHE_DIR")
+        # cached responses are only shared between clients using the same token
+        self.token_fingerprint = hashlib.sha256(github_token.encode("utf-8")).hexdigest()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if url.startswith("/"):
+            url = API_URL + url
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = self.endpoint_name(method, url)
+
+        for attempt in range(self.max_retries + 1):
+            self.throttle()
+            start_time = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.record(endpoint, time.monotonic() - start_time, error=True)
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"{method} {url} failed ({e}), retrying in {delay:.1f}s ...")
+                time.sleep(delay)
+                continue
+
+            self.record(endpoint, time.monotonic() - start_time, error=response.status_code >= 400)
+            self.update_rate_limit(response)
+
+            delay = self.retry_delay(response, attempt)
+            if delay is None or attempt == self.max_retries:
+                return response
+            print(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s ...")
+            time.sleep(delay)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def get_cached(self, url: str, **kwargs) -> requests.Response:
+        """GET that is revalidated against the on-disk cache, so an unchanged resource comes back
+        as a 304 (not counted against the primary rate limit) and is served from the cache.
+        Behaves like get() when no cache directory is configured.
+        """
+        if not self.cache_dir:
+            return self.get(url, **kwargs)
+        if url.startswith("/"):
+            url = API_URL + url
+        headers = dict(kwargs.pop("headers", None) or {})
+        cache_file = self.cache_file(url, kwargs.get("params"), headers)
+        cached = None
+        if os.path.exists(cache_file):
+            with open(cache_file) as file:
+                try:
+                    cached = json.load(file)
+                except json.JSONDecodeError:
+                    cached = None
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached:
+            with self.lock:
+                self.cache_hits += 1
+            return self.cached_response(response, cached)
+        if response.status_code == 200 and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self.store(cache_file, response)
+        return response
+
+    def cache_file(self, url: str, params, headers: dict) -> str:
+        query = json.dumps(sorted((params or {}).items()))
+        key = "\0".join([self.token_fingerprint, url, query, headers.get("Accept", "")])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def store(self, cache_file: str, response: requests.Response):
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "body": response.text
+        }
+        temp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+        with open(temp_file, "w") as file:
+            json.dump(entry, file)
+        os.replace(temp_file, cache_file)
+
+    def cached_response(self, not_modified: requests.Response, cached: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.headers.update(not_modified.headers)
+        if cached.get("content_type"):
+            response.headers["Content-Type"] = cached["content_type"]
+        response.encoding = "utf-8"
+        response._content = cached["body"].encode("utf-8")
+        return response
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def retry_delay(self, response: requests.Response, attempt: int):
+        """Returns the number of seconds to wait before retrying, or None if the response is final."""
+        status_code = response.status_code
+        if status_code in (403, 429):
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                return float(retry_after)
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset = int(response.headers.get("X-RateLimit-Reset", "0"))
+                return max(reset - time.time(), 0) + 1
+            if "secondary rate limit" in response.text.lower():
+                return self.backoff_delay(attempt, base=60)
+            return None
+        if status_code >= 500:
+            return self.backoff_delay(attempt)
+        return None
+
+    def backoff_delay(self, attempt: int, base: float = 1.0) -> float:
+        return base * (2 ** attempt) * (0.5 + random.random())
+
+    def update_rate_limit(self, response: requests.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.rate_remaining = int(remaining)
+            self.rate_reset = int(reset)
+
+    def throttle(self):
+        """Spreads the remaining rate limit budget over the time left before reset."""
+        with self.lock:
+            remaining = self.rate_remaining
+            reset = self.rate_reset
+        if remaining is None or remaining > self.min_remaining:
+            return
+        window = reset - time.time()
+        if window <= 0:
+            return
+        time.sleep(window / max(remaining, 1))
+
+    def endpoint_name(self, method: str, url: str) -> str:
+        path = url[len(API_URL):] if url.startswith(API_URL) else url
+        path = path.split("?")[0]
+        for pattern, replacement in ENDPOINT_PATTERNS:
+            path = pattern.sub(replacement, path)
+        return f"{method} {path}"
+
+    def record(self, endpoint: str, latency: float, error: bool = False):
+        with self.lock:
+            stat = self.stats.setdefault(endpoint, {"requests": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0})
+            stat["requests"] += 1
+            stat["errors"] += int(error)
+            stat["total_latency"] += latency
+            stat["max_latency"] = max(stat["max_latency"], latency)
+
+    def print_stats(self):
+        print("GitHub API usage:")
+        for endpoint, stat in sorted(self.stats.items()):
+            average = stat["total_latency"] / stat["requests"]
+            print(f"  {endpoint}: {stat['requests']} requests, {stat['errors']} errors, avg {average * 1000:.0f}ms, max {stat['max_latency'] * 1000:.0f}ms")
+        if self.cache_hits:
+            print(f"  served from cache (304): {self.cache_hits}")
+        if self.rate_remaining is not None:
+            print(f"  rate limit remaining: {self.rate_remaining}")
@@ -0,0 +1,104 @@
+
+import base64
+import hashlib
+from github_client import GitHubClient
+
+def git_blob_sha(content: bytes) -> str:
+    """Returns the sha git assigns to a blob with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def get_branch_sha(client: GitHubClient, org_name: str, repo_name: str, branch: str):
+    response = client.get(f"/repos/{org_name}/{repo_name}/git/ref/heads/{branch}")
+    if response.status_code != 200:
+        return None
+    return response.json()["object"]["sha"]
+
+def create_branch(client: GitHubClient, org_name: str, repo_name: str, branch: str, sha: str) -> bool:
+    response = client.post(f"/repos/{org_name}/{repo_name}/git/refs", json={"ref": f"refs/heads/{branch}", "sha": sha})
+    if response.status_code != 201:
+        print(f"Failed to create branch '{branch}' in '{repo_name}'. Error: {response.text}")
+    return response.status_code == 201
+
+def create_file(client: GitHubClient, org_name: str, repo_name: str, branch: str, path: str, content: bytes, message: str) -> bool:
+    """Creates a single file with the Contents API, which also works on empty repositories."""
+    data = {
+        "message": message,
+        "content": base64.b64encode(content).decode("utf-8"),
+        "branch": branch
+    }
+    response = client.put(f"/repos/{org_name}/{repo_name}/contents/{path}", json=data)
+    if response.status_code not in (200, 201):
+        print(f"Failed to create '{path}' in '{repo_name}'. Error: {response.text}")
+    return response.status_code in (200, 201)
+
+def read_tree(client: GitHubClient, org_name: str, repo_name: str, head_sha: str):
+    """Returns the tree sha of a commit and the blob sha of every file in it ({path: sha})."""
+    commit = client.get(f"/repos/{org_name}/{repo_name}/git/commits/{head_sha}").json()
+    response = client.get(f"/repos/{org_name}/{repo_name}/git/trees/{commit['tree']['sha']}", params={"recursive": "1"})
+    existing = {entry["path"]: entry["sha"] for entry in response.json().get("tree", []) if entry["type"] == "blob"}
+    return commit["tree"]["sha"], existing
+
+def diff_files(existing: dict, files: dict, replace_dir: str = None) -> dict:
+    """Returns {path: "added"|"modified"|"deleted"} for the files a commit_files call would change."""
+    changes = {}
+    for path, content in files.items():
+        if existing.get(path) != git_blob_sha(content):
+            changes[path] = "modified" if path in existing else "added"
+    if replace_dir:
+        prefix = replace_dir.rstrip("/") + "/"
+        for path in existing:
+            if path.startswith(prefix) and path not in files:
+                changes[path] = "deleted"
+    return changes
+
+def commit_files(client: GitHubClient, org_name: str, repo_name: str, branch: str, files: dict, message: str, replace_dir: str = None, author: dict = None) -> str:
+    """Commits files ({path: bytes}) to a branch through the Git Data API without a local clone.
+
+    Files whose blob sha already matches are skipped and nothing is committed when no file changed.
+    When replace_dir is given, other files under that directory are deleted.
+    Returns "unchanged", "committed", "missing_branch" or "failed".
+    """
+    for attempt in range(2):
+        head_sha = get_branch_sha(client, org_name, repo_name, branch)
+        if head_sha is None:
+            return "missing_branch"
+
+        tree_sha, existing = read_tree(client, org_name, repo_name, head_sha)
+
+        tree = []
+        for path, change in diff_files(existing, files, replace_dir).items():
+            if change == "deleted":
+                tree.append({"path": path, "mode": "100644", "type": "blob", "sha": None})
+                continue
+            blob = client.post(f"/repos/{org_name}/{repo_name}/git/blobs", json={"content": base64.b64encode(files[path]).decode("utf-8"), "encoding": "base64"})
+            if blob.status_code != 201:
+                print(f"Failed to create blob for '{path}' in '{repo_name}'. Error: {blob.text}")
+                return "failed"
+            tree.append({"path": path, "mode": "100644", "type": "blob", "sha": blob.json()["sha"]})
+
+        if not tree:
+            print(f"Files already up to date on '{branch}' branch of '{repo_name}'.")
+            return "unchanged"
+
+        new_tree = client.post(f"/repos/{org_name}/{repo_name}/git/trees", json={"base_tree": tree_sha, "tree": tree})
+        if new_tree.status_code != 201:
+            print(f"Failed to create tree in '{repo_name}'. Error: {new_tree.text}")
+            return "failed"
+        data = {"message": message, "tree": new_tree.json()["sha"], "parents": [head_sha]}
+        if author:
+            data["author"] = author
+            data["committer"] = author
+        new_commit = client.post(f"/repos/{org_name}/{repo_name}/git/commits", json=data)
+        if new_commit.status_code != 201:
+            print(f"Failed to create commit in '{repo_name}'. Error: {new_commit.text}")
+            return "failed"
+
+        response = client.patch(f"/repos/{org_name}/{repo_name}/git/refs/heads/{branch}", json={"sha": new_commit.json()["sha"], "force": False})
+        if response.status_code == 200:
+            print(f"Committed {len(tree)} file change(s) to '{branch}' branch of '{repo_name}'.")
+            return "committed"
+        # 422 means the branch moved while committing: start again from the new head
+        if response.status_code != 422 or attempt == 1:
+            print(f"Failed to update '{branch}' branch of '{repo_name}'. Error: {response.text}")
+            return "failed"
+    return "failed"
@@ -0,0 +1,118 @@
+
+import os
+import json
+from fnmatch import fnmatch
+from github_client import GitHubClient
+
+# Number of repositories read per GraphQL query, each one under its own alias
+BATCH_SIZE = int(os.getenv("GRAPHQL_BATCH_SIZE", "50"))
+
+PROTECTION_RULE_FIELDS = """
+        pattern
+        requiresApprovingReviews
+        requiredApprovingReviewCount
+        requiresCodeOwnerReviews
+        dismissesStaleReviews
+        requiresStatusChecks
+        requiresStrictStatusChecks
+        requiredStatusCheckContexts
+        isAdminEnforced
+        requiresLinearHistory
+        allowsForcePushes
+        allowsDeletions
+        requiresConversationResolution
+        requireLastPushApproval
+        blocksCreations
+        lockBranch
+        restrictsPushes
+        pushAllowances(first: 20) { nodes { actor { ... on Team { slug } ... on User { login } } } }
+        restrictsReviewDismissals
+        reviewDismissalAllowances(first: 20) { nodes { actor { ... on Team { slug } ... on User { login } } } }
+        bypassPullRequestAllowances(first: 20) { nodes { actor { ... on Team { slug } ... on User { login } } } }
+"""
+
+class RepoState:
+    """What one batched query learned about a repository."""
+
+    def __init__(self, name: str, data: dict = None, branches=()):
+        self.name = name
+        self.exists = data is not None
+        data = data or {}
+        self.database_id = data.get("databaseId")
+        self.default_branch = (data.get("defaultBranchRef") or {}).get("name")
+        # sha of each requested branch, None when the branch does not exist
+        self.branches = {}
+        for index, branch in enumerate(branches):
+            ref = data.get(f"branch_{index}")
+            self.branches[branch] = ref["target"]["oid"] if ref else None
+        self.topics = [node["topic"]["name"] for node in (data.get("repositoryTopics") or {}).get("nodes", [])]
+        self.environments = [node["name"] for node in (data.get("environments") or {}).get("nodes", [])]
+        self.protection_rules = {node["pattern"]: node for node in (data.get("branchProtectionRules") or {}).get("nodes", [])}
+
+    def has_branch(self, branch: str) -> bool:
+        return self.branches.get(branch) is not None
+
+    def protection_rule(self, branch: str):
+        return self.protection_rules.get(branch)
+
+    def has_matching_rule(self, branch: str) -> bool:
+        """True when some rule, including a wildcard one, applies to the branch."""
+        return any(fnmatch(branch, pattern) for pattern in self.protection_rules)
+
+def state_fields(branches) -> str:
+    branch_fields = "\n".join(
+        f'      branch_{index}: ref(qualifiedName: {json.dumps("refs/heads/" + branch)}) {{ target {{ oid }} }}'
+        for index, branch in enumerate(branches))
+    return f"""
+      databaseId
+      defaultBranchRef {{ name }}
+{branch_fields}
+      repositoryTopics(first: 100) {{ nodes {{ topic {{ name }} }} }}
+      environments(first: 100) {{ nodes {{ name }} }}
+      branchProtectionRules(first: 20) {{ nodes {{ {PROTECTION_RULE_FIELDS} }} }}"""
+
+def repository_query(repo_names: list, fields: str) -> str:
+    repositories = []
+    for index, repo_name in enumerate(repo_names):
+        repositories.append(f"""
+    repo_{index}: repository(owner: $owner, name: {json.dumps(repo_name)}) {{{fields}
+    }}""")
+    return "query($owner: String!) {" + "".join(repositories) + "\n}"
+
+def query_repositories(client: GitHubClient, org_name: str, repo_names: list, fields: str):
+    """Yields (repo_name, data) for every repository, reading fields of BATCH_SIZE repositories per query.
+
+    data is None for a repository that does not exist or is not visible.
+    Raises RuntimeError when a query fails as a whole.
+    """
+    for start in range(0, len(repo_names), BATCH_SIZE):
+        batch = repo_names[start:start + BATCH_SIZE]
+        response = client.post("/graphql", json={"query": repository_query(batch, fields), "variables": {"owner": org_name}})
+        if response.status_code != 200:
+            raise RuntimeError(f"GraphQL query failed with {response.status_code}: {response.text}")
+        result = response.json()
+        data = result.get("data")
+        if data is None:
+            raise RuntimeError(f"GraphQL query failed: {result.get('errors')}")
+        for error in result.get("errors", []):
+            if error.get("type") != "NOT_FOUND":
+                print(f"GraphQL error: {error.get('message')}")
+        for index, repo_name in enumerate(batch):
+            yield repo_name, data.get(f"repo_{index}")
+
+def fetch_repo_states(client: GitHubClient, org_name: str, repo_names: list, branches=("main", "development")) -> dict:
+    """Reads the state of many repositories with one GraphQL query per BATCH_SIZE repositories.
+
+    Returns {repo_name: RepoState}; a repository that does not exist or is not visible has exists False.
+    Raises RuntimeError when a query fails as a whole.
+    """
+    return {repo_name: RepoState(repo_name, data, branches)
+            for repo_name, data in query_repositories(client, org_name, repo_names, state_fields(branches))}
+
+def fetch_repository_ids(client: GitHubClient, org_name: str, repo_names: list) -> dict:
+    """Returns {repo_name: databaseId}, None for a repository that does not exist or is not visible.
+
+    Only the id is selected, so the query stays cheap and needs no admin rights.
+    """
+    return {repo_name: (data or {}).get("databaseId")
+            for repo_name, data in query_repositories(client, org_name, repo_names, "\n      databaseId")}
@@ -0,0 +1,109 @@
+
+import os
+import csv
+import sys
+import requests
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from github_client import GitHubClient
+
+PER_PAGE = 100
+# Number of pages fetched in parallel once the page count is known
+max_workers = int(os.getenv("INVENTORY_MAX_WORKERS", "8"))
+
+def last_page(response) -> int:
+    """Page count announced by the Link header; 1 when everything fit in the first page."""
+    last = response.links.get("last")
+    if not last:
+        return 1
+    return int(parse_qs(urlparse(last["url"]).query)["page"][0])
+
+def fetch_page(client: GitHubClient, path: str, params: dict, page: int) -> list:
+    response = client.get(path, params={**params, "per_page": PER_PAGE, "page": page})
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} page {page} returned {response.status_code}: {response.text}")
+    return response.json()
+
+def list_pages(client: GitHubClient, path: str, params: dict):
+    """Yields the items of every page in order. The first page tells how many pages there are,
+    the remaining ones are fetched concurrently.
+    """
+    response = client.get(path, params={**params, "per_page": PER_PAGE, "page": 1})
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} returned {response.status_code}: {response.text}")
+    yield from response.json()
+
+    pages = range(2, last_page(response) + 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for items in executor.map(lambda page: fetch_page(client, path, params, page), pages):
+            yield from items
+
+def read_interfaces(interfaces_csv: str) -> dict:
+    """interface_name per repo_name from an existing repos CSV."""
+    with open(interfaces_csv, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        return {row[0].strip(): row[1].strip() for row in reader if len(row) >= 2}
+
+def write_inventory(names, output_file: str, interfaces: dict = None) -> int:
+    """Streams names to output_file, one per line, or as repo_name,interface_name rows when it is a .csv.
+
+    The interface name of a repo missing from interfaces defaults to the repo name.
+    The rows go to a temporary file that replaces output_file only once every name was written,
+    so a failed listing leaves the previous inventory in place.
+    """
+    temp_file = f"{output_file}.tmp"
+    try:
+        count = write_rows(names, temp_file, output_file.endswith(".csv"), interfaces)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    os.replace(temp_file, output_file)
+    return count
+
+def write_rows(names, file_path: str, as_csv: bool, interfaces: dict = None) -> int:
+    count = 0
+    with open(file_path, "w", newline='') as file:
+        writer = None
+        if as_csv:
+            writer = csv.writer(file)
+            writer.writerow(["repo_name", "interface_name"])
+        for name in names:
+            if writer:
+                writer.writerow([name, (interfaces or {}).get(name, name)])
+            else:
+                file.write(f"{name}\n")
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) < 4 or args[1] not in ("repos", "members") or (args[1] == "members" and len(args) != 4) or len(args) > 5:
+        print("Usage: python org_inventory.py <github_token> repos <org> <output_file> [team] [--interfaces=<repos.csv>]")
+        print("       python org_inventory.py <github_token> members <org> <output_file>")
+        print("A .csv output_file is written as repo_name,interface_name rows.")
+        sys.exit(1)
+
+    github_token, kind, org_name, output_file = args[:4]
+    client = GitHubClient(github_token, pool_size=max_workers)
+    interfaces = {}
+    for option in options:
+        if option.startswith("--interfaces="):
+            interfaces = read_interfaces(option.split("=", 1)[1])
+
+    if kind == "members":
+        names = (member["login"] for member in list_pages(client, f"/orgs/{org_name}/members", {}))
+    elif len(args) == 5:
+        names = (repo["name"] for repo in list_pages(client, f"/orgs/{org_name}/teams/{args[4]}/repos", {}))
+    else:
+        names = (repo["name"] for repo in list_pages(client, f"/orgs/{org_name}/repos", {"type": "private"}))
+
+    try:
+        count = write_inventory(names, output_file, interfaces)
+    except (RuntimeError, requests.exceptions.RequestException) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"{count} {kind} written to {output_file}")
+    client.print_stats()
@@ -0,0 +1,215 @@
+
+import os
+import csv
+import sys
+import ruamel.yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from github_client import GitHubClient
+import github_commit
+import github_graphql
+from repo_policy import normalize_branch_protection, normalize_environment, diff_settings, render_workflow, branch_protection_from_rule
+
+# Number of repositories planned and applied in parallel
+max_workers = int(os.getenv("RECONCILE_MAX_WORKERS", "4"))
+
+class Change:
+    """One write the plan needs, with the drift that motivates it."""
+
+    def __init__(self, description: str, details: list, apply):
+        self.description = description
+        self.details = details
+        self.apply = apply
+
+def load_spec(spec_file: str) -> dict:
+    """Reads the desired state. Every section is optional:
+
+    topics: [name, ...]
+    branches: [main, development]          # main from the default branch, the others from main
+    codeowners: <CODEOWNERS file>
+    workflows: {workspace: <dir with calling-workflows>, files: [TCI-DEV.yml, ...]}
+    environments: {prod: <PUT payload>, ...}
+    branch_protection: {branches: [main, development], settings: <PUT payload>}
+    """
+    with open(spec_file) as file:
+        spec = ruamel.yaml.YAML(typ="safe").load(file) or {}
+    if spec.get("codeowners"):
+        with open(spec["codeowners"], "rb") as file:
+            spec["codeowners_content"] = file.read()
+    return spec
+
+def desired_files(spec: dict, interface_name: str) -> dict:
+    files = {}
+    workflows = spec.get("workflows") or {}
+    for workflow_file in workflows.get("files", []):
+        files[f".github/workflows/{workflow_file}"] = render_workflow(workflows["workspace"], workflow_file, interface_name)
+    if "codeowners_content" in spec:
+        files[".github/CODEOWNERS"] = spec["codeowners_content"]
+    return files
+
+def create_main(client: GitHubClient, org_name: str, repo_name: str, default_branch: str) -> bool:
+    default_sha = github_commit.get_branch_sha(client, org_name, repo_name, default_branch) if default_branch else None
+    if default_sha:
+        return github_commit.create_branch(client, org_name, repo_name, "main", default_sha)
+    return github_commit.create_file(client, org_name, repo_name, "main", "readme.md", repo_name.encode("utf-8"), "added readme.md")
+
+def create_from_main(client: GitHubClient, org_name: str, repo_name: str, branch: str) -> bool:
+    main_sha = github_commit.get_branch_sha(client, org_name, repo_name, "main")
+    return bool(main_sha) and github_commit.create_branch(client, org_name, repo_name, branch, main_sha)
+
+def put(client: GitHubClient, path: str, data: dict) -> bool:
+    response = client.put(path, json=data)
+    if response.status_code not in (200, 201, 204):
+        print(f"PUT {path} failed with {response.status_code}: {response.text}")
+    return response.status_code in (200, 201, 204)
+
+def current_branch_protection(client: GitHubClient, repo_path: str, state, branch: str):
+    """Current protection of an existing branch in the REST shape, None when it has none.
+
+    Answered from the prefetched rules; only a branch covered by a wildcard rule is read with REST.
+    """
+    rule = state.protection_rule(branch)
+    if rule is not None:
+        return branch_protection_from_rule(rule)
+    if not state.has_matching_rule(branch):
+        return None
+    response = client.get_cached(f"{repo_path}/branches/{branch}/protection")
+    if response.status_code == 200:
+        return response.json()
+    if response.status_code != 404:
+        raise RuntimeError(f"unable to read the protection of '{branch}': {response.text}")
+    return None
+
+def plan_repo(client: GitHubClient, org_name: str, spec: dict, state, repo_name: str, interface_name: str) -> list:
+    """Compares the desired state with the current one and returns the changes needed, in the
+    order they have to be applied: branches and files before the protection that would block them.
+    """
+    repo_path = f"/repos/{org_name}/{repo_name}"
+    branches = spec.get("branches") or []
+    missing_branches = [branch for branch in branches if not state.has_branch(branch)]
+    changes = []
+
+    if "main" in missing_branches:
+        changes.append(Change("create branch main", [f"from {state.default_branch or 'an initial readme.md'}"],
+                              lambda: create_main(client, org_name, repo_name, state.default_branch)))
+
+    files = desired_files(spec, interface_name)
+    if files:
+        existing = {}
+        if state.has_branch("main"):
+            existing = github_commit.read_tree(client, org_name, repo_name, state.branches["main"])[1]
+        replace_dir = ".github/workflows" if spec.get("workflows") else None
+        file_changes = github_commit.diff_files(existing, files, replace_dir)
+        if file_changes:
+            changes.append(Change("commit files to main", [f"{path}: {change}" for path, change in sorted(file_changes.items())],
+                                  lambda: github_commit.commit_files(client, org_name, repo_name, "main", files, "Update repository files",
+                                                                     replace_dir=replace_dir) in ("committed", "unchanged")))
+
+    for branch in missing_branches:
+        if branch != "main":
+            changes.append(Change(f"create branch {branch}", ["from main"],
+                                  lambda branch=branch: create_from_main(client, org_name, repo_name, branch)))
+
+    for env_name, settings in (spec.get("environments") or {}).items():
+        if env_name in state.environments:
+            current = client.get_cached(f"{repo_path}/environments/{env_name}").json()
+            drift = diff_settings(normalize_environment(settings), normalize_environment(current))
+        else:
+            drift = ["environment: missing"]
+        if drift:
+            changes.append(Change(f"update environment {env_name}", drift,
+                                  lambda env_name=env_name, settings=settings: put(client, f"{repo_path}/environments/{env_name}", settings)))
+
+    if spec.get("topics") is not None:
+        desired_topics = sorted(spec["topics"])
+        if desired_topics != sorted(state.topics):
+            changes.append(Change("update topics", [f"{sorted(state.topics)} -> {desired_topics}"],
+                                  lambda: put(client, f"{repo_path}/topics", {"names": desired_topics})))
+
+    protection = spec.get("branch_protection") or {}
+    for branch in protection.get("branches", []):
+        if not state.has_branch(branch) and branch not in missing_branches:
+            print(f"Branch '{branch}' does not exist in '{repo_name}', its protection is not planned.")
+            continue
+        current = current_branch_protection(client, repo_path, state, branch) if state.has_branch(branch) else None
+        drift = ["branch protection: missing"]
+        if current is not None:
+            drift = diff_settings(normalize_branch_protection(protection["settings"]), normalize_branch_protection(current))
+        if drift:
+            changes.append(Change(f"protect branch {branch}", drift,
+                                  lambda branch=branch: put(client, f"{repo_path}/branches/{branch}/protection", protection["settings"])))
+    return changes
+
+def reconcile_repo(client: GitHubClient, org_name: str, spec: dict, state, repo_name: str, interface_name: str, apply: bool) -> dict:
+    if state is None or not state.exists:
+        return {"changes": [], "result": "error: repository not found"}
+    try:
+        changes = plan_repo(client, org_name, spec, state, repo_name, interface_name)
+    except Exception as e:
+        return {"changes": [], "result": f"error: {e}"}
+    if not changes:
+        return {"changes": changes, "result": "compliant"}
+    if not apply:
+        return {"changes": changes, "result": f"{len(changes)} planned"}
+
+    for index, change in enumerate(changes):
+        try:
+            applied = change.apply()
+        except Exception as e:
+            print(f"Error while applying '{change.description}' to '{repo_name}': {e}")
+            applied = False
+        if not applied:
+            # later changes depend on the earlier ones, so stop at the first failure
+            return {"changes": changes, "result": f"failed: {change.description} ({index}/{len(changes)} applied)"}
+    return {"changes": changes, "result": f"{len(changes)} applied"}
+
+def print_plan(repo_name: str, status: dict):
+    print(f"{repo_name}: {status['result']}")
+    for change in status["changes"]:
+        print(f"  {change.description}")
+        for detail in change.details:
+            print(f"    {detail}")
+
+def read_repos(repos_file: str) -> dict:
+    """interface_name per repo_name from the repos CSV."""
+    repos = {}
+    with open(repos_file, newline='') as file:
+        repo_reader = csv.reader(file)
+        next(repo_reader)
+        for repo_row in repo_reader:
+            if len(repo_row) >= 2:
+                repos[repo_row[0].strip()] = repo_row[1].strip()
+            else:
+                print(f"Skipping invalid repo row: {repo_row}")
+    return repos
+
+if __name__ == "__main__":
+    if len(sys.argv) < 5 or sys.argv[5:] not in ([], ["--apply"]):
+        print("Usage: python reconcile.py <org> <github_token> <repos_file> <spec.yaml> [--apply]")
+        print("Without --apply only the plan is printed.")
+        sys.exit(1)
+
+    org_name, github_token, repos_file, spec_file = sys.argv[1:5]
+    apply = "--apply" in sys.argv[5:]
+    client = GitHubClient(github_token, pool_size=max_workers)
+    spec = load_spec(spec_file)
+    repos = read_repos(repos_file)
+
+    branches = ["main"] + (spec.get("branches") or []) + (spec.get("branch_protection") or {}).get("branches", [])
+    states = github_graphql.fetch_repo_states(client, org_name, list(repos), branches=tuple(dict.fromkeys(branches)))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(reconcile_repo, client, org_name, spec, states.get(repo_name), repo_name, interface_name, apply): repo_name
+                   for repo_name, interface_name in repos.items()}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    for repo_name in sorted(results):
+        print_plan(repo_name, results[repo_name])
+    client.print_stats()
+
+    compliant = sum(1 for status in results.values() if status["result"] == "compliant")
+    failed = sum(1 for status in results.values() if status["result"].startswith(("failed", "error")))
+    print(f"{len(results)} repositories: {compliant} compliant, {len(results) - compliant - failed} {'applied' if apply else 'to change'}, {failed} failed")
+    if failed:
+        sys.exit(1)
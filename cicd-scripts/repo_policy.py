@@ -0,0 +1,107 @@
+
+import io
+import os
+import ruamel.yaml
+
+def normalize_actors(actors: dict) -> dict:
+    # GET returns user/team objects while PUT takes logins and team slugs
+    return {
+        "users": sorted(user["login"].lower() if isinstance(user, dict) else user.lower() for user in actors.get("users", [])),
+        "teams": sorted(team["slug"].lower() if isinstance(team, dict) else team.lower() for team in actors.get("teams", []))
+    }
+
+def normalize_branch_protection(protection: dict) -> dict:
+    """Converts a branch protection (GET response or PUT payload) to a comparable form."""
+    normalized = {}
+    status_checks = protection.get("required_status_checks")
+    normalized["required_status_checks"] = None if status_checks is None else {
+        "strict": status_checks.get("strict", False),
+        "contexts": sorted(status_checks.get("contexts", []))
+    }
+    reviews = protection.get("required_pull_request_reviews")
+    normalized["required_pull_request_reviews"] = None if reviews is None else {
+        "dismissal_restrictions": normalize_actors(reviews.get("dismissal_restrictions", {})),
+        "dismiss_stale_reviews": reviews.get("dismiss_stale_reviews", False),
+        "require_code_owner_reviews": reviews.get("require_code_owner_reviews", False),
+        "required_approving_review_count": reviews.get("required_approving_review_count", 0),
+        "require_last_push_approval": reviews.get("require_last_push_approval", False),
+        "bypass_pull_request_allowances": normalize_actors(reviews.get("bypass_pull_request_allowances", {}))
+    }
+    restrictions = protection.get("restrictions")
+    normalized["restrictions"] = None if restrictions is None else normalize_actors(restrictions)
+    for flag in ["enforce_admins", "required_linear_history", "allow_force_pushes", "allow_deletions",
+                 "block_creations", "required_conversation_resolution", "lock_branch"]:
+        value = protection.get(flag, False)
+        normalized[flag] = value.get("enabled", False) if isinstance(value, dict) else bool(value)
+    return normalized
+
+def rule_actors(connection: dict) -> dict:
+    actors = [node["actor"] or {} for node in (connection or {}).get("nodes", [])]
+    return {
+        "users": [actor["login"] for actor in actors if "login" in actor],
+        "teams": [actor["slug"] for actor in actors if "slug" in actor]
+    }
+
+def branch_protection_from_rule(rule: dict) -> dict:
+    """Converts a GraphQL branchProtectionRule to the REST shape normalize_branch_protection takes."""
+    return {
+        "required_status_checks": {
+            "strict": rule["requiresStrictStatusChecks"],
+            "contexts": rule["requiredStatusCheckContexts"] or []
+        } if rule["requiresStatusChecks"] else None,
+        "required_pull_request_reviews": {
+            "dismissal_restrictions": rule_actors(rule["reviewDismissalAllowances"]) if rule["restrictsReviewDismissals"] else {},
+            "dismiss_stale_reviews": rule["dismissesStaleReviews"],
+            "require_code_owner_reviews": rule["requiresCodeOwnerReviews"],
+            "required_approving_review_count": rule["requiredApprovingReviewCount"] or 0,
+            "require_last_push_approval": rule["requireLastPushApproval"],
+            "bypass_pull_request_allowances": rule_actors(rule["bypassPullRequestAllowances"])
+        } if rule["requiresApprovingReviews"] else None,
+        "restrictions": rule_actors(rule["pushAllowances"]) if rule["restrictsPushes"] else None,
+        "enforce_admins": rule["isAdminEnforced"],
+        "required_linear_history": rule["requiresLinearHistory"],
+        "allow_force_pushes": rule["allowsForcePushes"],
+        "allow_deletions": rule["allowsDeletions"],
+        "block_creations": rule["blocksCreations"],
+        "required_conversation_resolution": rule["requiresConversationResolution"],
+        "lock_branch": rule["lockBranch"]
+    }
+
+def normalize_environment(environment: dict) -> dict:
+    """Converts an environment (GET response or PUT payload) to a comparable form."""
+    if "protection_rules" in environment:
+        rules = {rule["type"]: rule for rule in environment.get("protection_rules", [])}
+        reviewers = rules.get("required_reviewers", {})
+        return {
+            "wait_timer": rules.get("wait_timer", {}).get("wait_timer", 0),
+            "prevent_self_review": reviewers.get("prevent_self_review", False),
+            "reviewers": sorted(f"{reviewer['type']}:{reviewer['reviewer']['id']}" for reviewer in reviewers.get("reviewers", [])),
+            "deployment_branch_policy": environment.get("deployment_branch_policy")
+        }
+    return {
+        "wait_timer": environment.get("wait_timer", 0),
+        "prevent_self_review": environment.get("prevent_self_review", False),
+        "reviewers": sorted(f"{reviewer['type']}:{reviewer['id']}" for reviewer in environment.get("reviewers", [])),
+        "deployment_branch_policy": environment.get("deployment_branch_policy")
+    }
+
+def diff_settings(desired: dict, current: dict, prefix: str = "") -> list:
+    drift = []
+    for key, desired_value in desired.items():
+        current_value = current.get(key) if current else None
+        if isinstance(desired_value, dict) and isinstance(current_value, dict):
+            drift += diff_settings(desired_value, current_value, f"{prefix}{key}.")
+        elif desired_value != current_value:
+            drift.append(f"{prefix}{key}: {current_value} -> {desired_value}")
+    return drift
+
+def render_workflow(workspace: str, workflow_file: str, interface_name: str) -> bytes:
+    source_file_path = os.path.join(workspace, "calling-workflows", workflow_file)
+    yaml = ruamel.yaml.YAML()
+    with open(source_file_path, 'r') as file:
+        data = yaml.load(file)
+    file_name = workflow_file.split('.yml')[0]
+    data["jobs"][file_name]["with"]["INTERFACE_NAME"] = interface_name
+    stream = io.StringIO()
+    yaml.dump(data, stream)
+    return stream.getvalue().encode("utf-8")
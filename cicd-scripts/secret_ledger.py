@@ -0,0 +1,53 @@
+
+import os
+import hmac
+import json
+import hashlib
+import secrets
+import threading
+
+class SecretLedger:
+    """Local JSON ledger of the secret values already pushed to each repository.
+
+    GitHub never returns secret values, so the ledger keeps a salted HMAC of each
+    value together with the public key_id it was encrypted with. A secret only
+    needs to be pushed again when its value or the repository key changed.
+    The salt is read from the salt argument when given (kept out of the file),
+    otherwise it is generated once and stored in the ledger.
+    """
+
+    def __init__(self, ledger_file: str, salt: str = None):
+        self.ledger_file = ledger_file
+        self.lock = threading.Lock()
+        data = {}
+        if os.path.exists(ledger_file):
+            with open(ledger_file) as file:
+                data = json.load(file)
+        self.entries = data.get("entries", {})
+        self.stored_salt = None if salt else data.get("salt", secrets.token_hex(16))
+        self.salt = (salt or self.stored_salt).encode("utf-8")
+
+    def digest(self, secret_value: str) -> str:
+        return hmac.new(self.salt, secret_value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def is_current(self, owner: str, secret_name: str, secret_value: str, key_id: str) -> bool:
+        with self.lock:
+            entry = self.entries.get(owner, {}).get(secret_name)
+        if entry is None:
+            return False
+        return entry["key_id"] == str(key_id) and hmac.compare_digest(entry["hash"], self.digest(secret_value))
+
+    def record(self, owner: str, secret_name: str, secret_value: str, key_id: str):
+        entry = {"hash": self.digest(secret_value), "key_id": str(key_id)}
+        with self.lock:
+            self.entries.setdefault(owner, {})[secret_name] = entry
+
+    def save(self):
+        data = {"entries": self.entries}
+        if self.stored_salt:
+            data["salt"] = self.stored_salt
+        temp_file = f"{self.ledger_file}.tmp"
+        with self.lock:
+            with open(temp_file, "w") as file:
+                json.dump(data, file, indent=2, sort_keys=True)
+            os.replace(temp_file, self.ledger_file)
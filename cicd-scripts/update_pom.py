@@ -1,37 +1,175 @@
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from xml.parsers import expat
 
-# Specify the path to your pom.xml file
-pom_file_path = sys.argv[1]
-
-# Read the content of the pom.xml file
-with open(pom_file_path, "r") as file:
-    content = file.read()
-
-# Check if the sanofi-artifactory string is present
-if "sanofi-artifactory" in content:
-    print("sanofi-artifactory string already exists in the pom.xml file. No modifications needed.")
-else:
-    # Create the repository block
-    repository_block = """
-    <repositories>
-        <repository>
-            <id>artifactory</id>
-            <name>sanofi-artifactory</name>
-            <url>https://sanofi.jfrog.io/artifactory/maven-chc-maven-local</url>
-        </repository>
-    </repositories>
+REPOSITORY = {
+    "id": "artifactory",
+    "name": "sanofi-artifactory",
+    "url": "https://sanofi.jfrog.io/artifactory/maven-chc-maven-local"
+}
+# Directories never searched for pom.xml files
+SKIP_DIRS = {".git", "target", "node_modules"}
+# Number of poms patched in parallel when a directory or several poms are given
+max_workers = int(os.getenv("POM_MAX_WORKERS", "0")) or os.cpu_count()
+
+class PomScanner:
+    """Collects in one expat pass the byte offsets needed to patch a pom.
+
+    Only the <repositories> element directly under <project> counts, so comments, profiles and
+    pluginRepositories are never mistaken for it.
     """
 
-    # Find the position to insert the repository block
-    insert_position = content.find("</project>")
+    def __init__(self, content):
+        self.content = content
+        self.stack = []
+        self.text = []
+        self.repository = {}
+        self.encoding = "utf-8"
+        self.present = False
+        self.first_child_start = None
+        self.repositories_start = None
+        self.repositories_end = None
+        self.project_end = None
+
+        self.parser = expat.ParserCreate()
+        self.parser.XmlDeclHandler = self.xml_declaration
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.text.append
+        self.parser.Parse(content, True)
+
+    def xml_declaration(self, version, encoding, standalone):
+        if encoding:
+            self.encoding = encoding
+
+    def start_element(self, name, attributes):
+        self.stack.append(name)
+        path = "/".join(self.stack)
+        if len(self.stack) == 2 and self.first_child_start is None:
+            self.first_child_start = self.parser.CurrentByteIndex
+        if path == "project/repositories":
+            self.repositories_start = self.parser.CurrentByteIndex
+        elif path == "project/repositories/repository":
+            self.repository = {}
+        self.text.clear()
+
+    def end_element(self, name):
+        path = "/".join(self.stack)
+        if path in ("project/repositories/repository/id", "project/repositories/repository/name", "project/repositories/repository/url"):
+            self.repository[name] = "".join(self.text).strip()
+        elif path == "project/repositories/repository":
+            if self.repository.get("url") == REPOSITORY["url"] or self.repository.get("name") == REPOSITORY["name"]:
+                self.present = True
+        elif path == "project/repositories":
+            self.repositories_end = self.parser.CurrentByteIndex
+        elif path == "project":
+            self.project_end = self.parser.CurrentByteIndex
+        self.stack.pop()
+
+    def indent(self, index):
+        """Whitespace before index on its line, or None when the line has other content before it."""
+        line_start = self.content.rfind(b"\n", 0, index) + 1
+        prefix = self.content[line_start:index]
+        return prefix.decode("ascii") if prefix.strip() == b"" else None
+
+    def line_start(self, index):
+        return self.content.rfind(b"\n", 0, index) + 1
 
-    if insert_position != -1:
-        # Insert the repository block before the closing </project> tag
-        updated_content = content[:insert_position] + repository_block + content[insert_position:]
+def repository_lines(indent, unit):
+    lines = [f"{indent}<repository>"]
+    for field in ("id", "name", "url"):
+        lines.append(f"{indent}{unit}<{field}>{REPOSITORY[field]}</{field}>")
+    lines.append(f"{indent}</repository>")
+    return lines
 
-        # Write the modified pom.xml file
-        with open(pom_file_path, "w") as file:
+def patch_content(content):
+    """Returns the patched pom bytes, or None when the repository is already declared."""
+    pom = PomScanner(content)
+    if pom.present:
+        return None
+    if pom.project_end is None:
+        raise ValueError("Unable to find the </project> tag")
+
+    newline = "\r\n" if b"\r\n" in content else "\n"
+    project_indent = pom.indent(pom.project_end) or ""
+    child_start = pom.repositories_start if pom.repositories_start is not None else pom.first_child_start
+    child_indent = pom.indent(child_start) if child_start is not None else None
+    unit = (child_indent or "")[len(project_indent):] or "    "
+
+    if pom.repositories_start is not None:
+        repositories_indent = pom.indent(pom.repositories_start) or project_indent + unit
+        start_tag_end = content.index(b">", pom.repositories_start) + 1
+        if content[start_tag_end - 2:start_tag_end] == b"/>":
+            # <repositories/>: replace the empty element by a full one
+            lines = ["<repositories>"] + repository_lines(repositories_indent + unit, unit) + [f"{repositories_indent}</repositories>"]
+            start, end, block = pom.repositories_start, start_tag_end, newline.join(lines)
+        else:
+            closing_indent = pom.indent(pom.repositories_end)
+            lines = repository_lines((closing_indent if closing_indent is not None else repositories_indent) + unit, unit)
+            if closing_indent is not None:
+                start = end = pom.line_start(pom.repositories_end)
+                block = newline.join(lines) + newline
+            else:
+                start = end = pom.repositories_end
+                block = newline + newline.join(lines) + newline + repositories_indent
+    else:
+        lines = [f"{project_indent}{unit}<repositories>"] + repository_lines(project_indent + 2 * unit, unit) + [f"{project_indent}{unit}</repositories>"]
+        if pom.indent(pom.project_end) is not None:
+            start = end = pom.line_start(pom.project_end)
+            block = newline.join(lines) + newline
+        else:
+            start = end = pom.project_end
+            block = newline + newline.join(lines) + newline
+    return content[:start] + block.encode(pom.encoding) + content[end:]
+
+def update_pom(pom_file_path):
+    """Adds the artifactory repository to one pom. Returns (pom_file_path, result)."""
+    try:
+        with open(pom_file_path, "rb") as file:
+            content = file.read()
+        updated_content = patch_content(content)
+        if updated_content is None:
+            return pom_file_path, "unchanged"
+        with open(pom_file_path, "wb") as file:
             file.write(updated_content)
+        return pom_file_path, "updated"
+    except (OSError, ValueError, expat.ExpatError) as e:
+        return pom_file_path, f"error: {e}"
+
+def find_poms(paths):
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            if "pom.xml" in files:
+                yield os.path.join(root, "pom.xml")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python update_pom.py <pom.xml|directory> ...")
+        sys.exit(1)
+
+    poms = list(find_poms(sys.argv[1:]))
+    if len(poms) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(update_pom, poms, chunksize=8))
     else:
-        print("Error: Unable to find the </project> tag in the pom.xml file.")
+        results = [update_pom(pom) for pom in poms]
+
+    for pom_file_path, result in results:
+        if result == "unchanged":
+            print(f"{pom_file_path}: sanofi-artifactory repository already exists. No modifications needed.")
+        elif result == "updated":
+            print(f"{pom_file_path}: sanofi-artifactory repository added.")
+        else:
+            print(f"Error: {pom_file_path}: {result[len('error: '):]}")
+    failed = sum(1 for _, result in results if result.startswith("error"))
+    if len(results) > 1:
+        updated = sum(1 for _, result in results if result == "updated")
+        print(f"{len(results)} poms: {updated} updated, {len(results) - updated - failed} unchanged, {failed} failed")
+    if failed:
+        sys.exit(1)